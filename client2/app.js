@@ -99,12 +99,50 @@ function authHeader() {
   return t ? { 'Authorization': `Bearer ${t}` } : {};
 }
 
-async function fetchInternships(q, category) {
+// Last body and ETag of recent conditional GETs, keyed by URL and auth token.
+// The server answers If-None-Match with an empty 304 when nothing changed.
+// Bounded (least recently used first out) so search results don't pile up.
+const ETAG_CACHE_SIZE = 20;
+const etagCache = new Map();
+
+function rememberETag(key, entry) {
+  etagCache.delete(key);
+  etagCache.set(key, entry);
+  while (etagCache.size > ETAG_CACHE_SIZE) {
+    etagCache.delete(etagCache.keys().next().value);
+  }
+}
+
+async function fetchWithETag(url, options = {}) {
+  const headers = { ...(options.headers || {}) };
+  const key = `${url} ${headers['Authorization'] || ''}`;
+  const cached = etagCache.get(key);
+  if (cached) headers['If-None-Match'] = cached.etag;
+  const res = await fetch(url, { ...options, headers });
+  if (res.status === 304 && cached) {
+    rememberETag(key, cached);
+    return { ok: true, status: 200, json: async () => cached.body };
+  }
+  const etag = res.headers.get('ETag');
+  if (!res.ok || !etag) return res;
+  const body = await res.json();
+  rememberETag(key, { etag, body });
+  return { ok: true, status: res.status, json: async () => body };
+}
+
+// Internships are fetched a page at a time; "Load more" follows next_cursor
+const PAGE_SIZE = 50;
+let shownInternships = [];
+let nextCursor = null;
+
+async function fetchInternships(q, category, cursor) {
   try {
     const params = new URLSearchParams();
     if (q) params.set('q', q);
     if (category) params.set('category', category);
-    const res = await fetch(`${API_BASE}/internships?${params.toString()}`);
+    params.set('limit', PAGE_SIZE);
+    if (cursor) params.set('cursor', cursor);
+    const res = await fetchWithETag(`${API_BASE}/internships?${params.toString()}`);
     return await res.json();
   } catch (e) {
     console.error('Error fetching internships:', e);
@@ -112,6 +150,10 @@ async function fetchInternships(q, category) {
   }
 }
 
+// Catalogue rows spell "no value" as N/A (current loader) or nan / a placeholder contact (older loads)
+const MISSING_VALUES = ['', 'nan', 'N/A', 'Unknown', 'contact@example.com'];
+const hasValue = v => v !== undefined && v !== null && !MISSING_VALUES.includes(String(v).trim());
+
 function renderInternships(list) {
   resultsDiv.innerHTML = '';
   if (!list || list.length === 0) {
@@ -123,7 +165,7 @@ function renderInternships(list) {
   const collapseContainer = document.createElement('div');
   collapseContainer.style.cssText = 'grid-column:1/-1;padding:10px;background:#f0f0f0;border-radius:5px;margin-bottom:10px;display:flex;justify-content:space-between;align-items:center;';
   collapseContainer.innerHTML = `
-    <span style="font-weight:bold;">${list.length} internships found</span>
+    <span style="font-weight:bold;">${list.length} internships ${nextCursor ? 'shown' : 'found'}</span>
     <button id="toggle-results" class="btn btn-secondary" style="padding:6px 12px;font-size:12px;">Collapse</button>
   `;
   resultsDiv.appendChild(collapseContainer);
@@ -141,27 +183,27 @@ function renderInternships(list) {
     // Build HTML with conditional fields
     let html = `<h4>${i.name}</h4>`;
     
-    if (i.organization && i.organization !== 'nan' && i.organization !== 'Unknown') {
+    if (hasValue(i.organization)) {
       html += `<div><strong>${i.organization}</strong></div>`;
     }
     
-    if (i.location && i.location !== 'nan' && i.location !== 'Unknown') {
+    if (hasValue(i.location)) {
       html += `<div>📍 ${i.location}</div>`;
     }
     
-    if (i.category && i.category !== 'nan') {
+    if (hasValue(i.category)) {
       html += `<div>🏷️ ${i.category}</div>`;
     }
     
-    if (i.deadline && i.deadline !== 'nan') {
+    if (hasValue(i.deadline)) {
         html += `<div><small style="color:#f00;">📅 Deadline: ${i.deadline}</small></div>`;
     }
     
-    if (i.description && i.description !== 'nan') {
+    if (hasValue(i.description)) {
       html += `<div style="height:60px;overflow:hidden;font-size:13px;color:#666;margin:8px 0;">${i.description}</div>`;
     }
     
-    if (i.contact && i.contact !== 'nan' && i.contact !== 'contact@example.com') {
+    if (hasValue(i.contact)) {
       html += `<div><small>📧 ${i.contact}</small></div>`;
     }
     
@@ -179,6 +221,14 @@ function renderInternships(list) {
   });
   
   resultsDiv.appendChild(resultsContainer);
+
+  if (nextCursor) {
+    const moreContainer = document.createElement('div');
+    moreContainer.style.cssText = 'grid-column:1/-1;text-align:center;padding:10px;';
+    moreContainer.innerHTML = '<button type="button" id="load-more" class="btn btn-secondary">Load more</button>';
+    resultsDiv.appendChild(moreContainer);
+    document.getElementById('load-more').addEventListener('click', e => { e.preventDefault(); loadMore(); });
+  }
   
   // Add collapse toggle functionality
   const toggleBtn = document.getElementById('toggle-results');
@@ -200,10 +250,12 @@ function renderInternships(list) {
 
 async function loadCategories() {
   try {
-    const json = await fetchInternships();
-    if (json && json.internships) {
-      const cats = new Set(json.internships.map(i => i.category).filter(Boolean));
-      catSelect.innerHTML = '<option value="">All Categories</option>' + [...cats].map(c => `<option value="${c}">${c}</option>`).join('');
+    // Facet counts only, instead of downloading every internship
+    const res = await fetchWithETag(`${API_BASE}/internships/facets`);
+    const json = await res.json();
+    if (json && json.facets) {
+      const cats = json.facets.category.map(f => f.value);
+      catSelect.innerHTML = '<option value="">All Categories</option>' + cats.map(c => `<option value="${c}">${c}</option>`).join('');
     }
   } catch (e) {
     console.error('Error loading categories:', e);
@@ -214,7 +266,21 @@ async function loadAndRender() {
   const q = qInput.value.trim();
   const cat = catSelect.value;
   const json = await fetchInternships(q, cat);
-  if (json && json.internships) renderInternships(json.internships);
+  if (json && json.internships) {
+    shownInternships = json.internships;
+    nextCursor = json.next_cursor || null;
+    renderInternships(shownInternships);
+  }
+}
+
+async function loadMore() {
+  if (!nextCursor) return;
+  const json = await fetchInternships(qInput.value.trim(), catSelect.value, nextCursor);
+  if (json && json.internships) {
+    shownInternships = shownInternships.concat(json.internships);
+    nextCursor = json.next_cursor || null;
+    renderInternships(shownInternships);
+  }
 }
 
 searchBtn.addEventListener('click', e => { e.preventDefault(); loadAndRender(); });
@@ -355,7 +421,7 @@ showProfileBtn && showProfileBtn.addEventListener('click', (e) => {
 
 async function fetchProfile() {
   try {
-    const res = await fetch(`${API_BASE}/profile`, { headers: { ...authHeader() } });
+    const res = await fetchWithETag(`${API_BASE}/profile`, { headers: { ...authHeader() } });
     if (!res.ok) return null;
     const j = await res.json();
     if (j.success) return j.user;
@@ -525,6 +591,10 @@ logoutBtn.addEventListener('click', (e) => {
   e.preventDefault();
   e.stopPropagation();
   console.log('Logout button clicked — clearing auth');
+  // Revoke the session server-side; the local logout doesn't wait for it
+  if (localStorage.getItem('auth_token')) {
+    fetch(`${API_BASE}/logout`, { method: 'POST', headers: { ...authHeader() } }).catch(err => console.error('Logout request failed:', err));
+  }
   localStorage.removeItem('auth_token');
   localStorage.removeItem('user_role');
   setLoggedOut();
@@ -539,7 +609,7 @@ async function loadTracker() {
   try {
     let res;
     try {
-      res = await fetch(`${API_BASE}/tracker`, { headers: { ...authHeader() } });
+      res = await fetch(`${API_BASE}/tracker?expand=internship`, { headers: { ...authHeader() } });
     } catch (err) {
       trackerList.innerHTML = '<div class="tracker-item" style="color:red;">Network error loading tracker</div>';
       console.error('Tracker GET network error:', err);
@@ -567,18 +637,11 @@ async function loadTracker() {
       if (j.trackers.length === 0) {
         trackerList.innerHTML = '<div class="tracker-item">No tracked internships yet</div>';
       } else {
-        // Fetch internship details for each tracked item
-        const internshipMap = {};
-        const ids = j.trackers.map(t => t.internshipId);
-        // Fetch all internships (could optimize to fetch only needed)
-        const allInternships = await fetchInternships();
-        if (allInternships && allInternships.internships) {
-          allInternships.internships.forEach(i => { internshipMap[i.id] = i; });
-        }
+        // Internship details come joined in by the server (?expand=internship)
         // Helper to show N/A for nan
         const show = v => (v === 'nan' || v === undefined || v === null || v === '') ? 'N/A' : v;
         trackerList.innerHTML = j.trackers.map(t => {
-          const i = internshipMap[t.internshipId] || {};
+          const i = t.internship || {};
           return `<div class="tracker-item" style="border:1px solid #eee;padding:10px;margin-bottom:10px;border-radius:6px;">
             <strong>${show(i.name) || t.internshipId.substring(0,8)}</strong><br/>
             ${i.organization ? `<div><strong>${show(i.organization)}</strong></div>` : ''}
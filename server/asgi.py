@@ -0,0 +1,117 @@
+import time
+import asyncio
+import logging
+from werkzeug.http import parse_accept_header
+import authentication
+import compression
+import serialization
+import main
+import metrics
+from llamaquery_ai import get_student_recommendations_async
+
+logger = logging.getLogger(__name__)
+
+'''
+ASGI entry point: GET /api/recommendations runs on asyncio, everything else
+is the regular Flask app behind asgiref's WSGI adapter.
+
+    uvicorn asgi:app --workers 4
+
+A recommendation request spends most of its time waiting on the LLM. Here
+that wait is an await on an async client (at most
+INTERNNET_LLM_MAX_CONCURRENCY calls in flight per worker, see
+llm_backends), and the DB/CPU steps run in worker threads, so a few slow
+LLM calls no longer tie up the threads serving every other route.
+
+asgiref is an optional dependency, only needed for this entry point.
+'''
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:
+    WsgiToAsgi = None
+
+RECOMMENDATIONS_PATH = "/api/recommendations"
+
+# Same CORS headers flask-cors adds to the Flask routes
+CORS_HEADERS = [
+    (b"access-control-allow-origin", b"*"),
+    (b"access-control-expose-headers", b"ETag"),
+]
+
+
+async def _send_json(send, status, body, accept_encoding=b"", start=None):
+    headers = [(b"content-type", b"application/json"), (b"vary", b"Accept-Encoding")] + CORS_HEADERS
+    encoding = compression.choose_encoding(parse_accept_header(accept_encoding.decode("latin-1")))
+    if encoding and len(body) >= compression.MIN_SIZE:
+        body = compression.compress(body, encoding)
+        headers.append((b"content-encoding", encoding.encode("ascii")))
+    headers.append((b"content-length", str(len(body)).encode("ascii")))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+    if start is not None:
+        metrics.REQUEST_LATENCY.observe(time.perf_counter() - start, route="api.get_recommendations",
+                                        method="GET", status=status)
+
+
+async def recommendations(scope, receive, send):
+    """Async twin of main.get_recommendations (same auth, statuses and body)."""
+    start = time.perf_counter()
+    headers = dict(scope.get("headers") or [])
+    accept_encoding = headers.get(b"accept-encoding", b"")
+    try:
+        auth = headers.get(b"authorization", b"").decode("latin-1")
+        token = None
+        if auth and auth.startswith('Bearer '):
+            token = auth.split(' ', 1)[1]
+
+        user = await asyncio.to_thread(authentication.get_identity_by_token, token)
+        if not user:
+            payload = {"success": False, "error": "Unauthorized", "details": "Invalid or missing auth token"}
+            return await _send_json(send, 401, serialization.dumps(payload), accept_encoding, start)
+
+        # Only students can get recommendations (admins have is_admin flag)
+        if user.get('is_admin'):
+            payload = {"success": False, "error": "Forbidden", "details": "Only students can receive recommendations"}
+            return await _send_json(send, 403, serialization.dumps(payload), accept_encoding, start)
+
+        result = await get_student_recommendations_async(user.get('username'))
+        status = 200 if result.get('success') else 400
+        await _send_json(send, status, serialization.dumps(result), accept_encoding, start)
+
+    except Exception as e:
+        logger.error(f"Recommendations error: {str(e)}", exc_info=True)
+        payload = {"success": False, "error": "Server error", "details": str(e)}
+        await _send_json(send, 500, serialization.dumps(payload), accept_encoding, start)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await asyncio.to_thread(main.initialize)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await asyncio.to_thread(main.shutdown)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+def create_asgi_app(wsgi_app=None):
+    """ASGI app serving recommendations natively and the rest through Flask."""
+    if WsgiToAsgi is None:
+        raise RuntimeError("asgi.py needs asgiref (pip install asgiref uvicorn)")
+    flask_app = WsgiToAsgi(wsgi_app or main.create_app())
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await _lifespan(receive, send)
+        if scope["type"] == "http" and scope["path"] == RECOMMENDATIONS_PATH and scope["method"] == "GET":
+            return await recommendations(scope, receive, send)
+        # Preflight (OPTIONS) and every other route go to Flask
+        return await flask_app(scope, receive, send)
+
+    return app
+
+
+app = create_asgi_app()
@@ -1,21 +1,30 @@
 import sqlite3
-import json
 import os
 import logging
 import secrets
 import hashlib
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('authentication.log'),
-        logging.StreamHandler()
-    ]
-)
+import threading
+import time
+from collections import OrderedDict
+from database import pool
+import logging_setup
+import profile_snapshots
+import sessions
+
+# Configure logging (queued JSON file + console, see logging_setup)
+logging_setup.configure_logging()
 logger = logging.getLogger(__name__)
 
+USERS_DB = 'users.db'
+
+# Profile fields returned for a student, in order (get_user_by_token, profile snapshots)
+PROFILE_COLUMNS = ("username", "first_name", "last_name", "school", "email_personal", "email_school", "age", "grade",
+                   "extracurriculars", "interests", "gpa", "courses", "profile_version")
+
+# Token -> identity cache (see TokenCache)
+TOKEN_CACHE_SIZE = int(os.environ.get('INTERNNET_TOKEN_CACHE_SIZE', '2048'))
+TOKEN_CACHE_TTL = float(os.environ.get('INTERNNET_TOKEN_CACHE_TTL', '300'))
+
 normal_auth = ["username", "password", "first_name", "last_name", "school", "email_personal", "email_school", "age", "grade", "extracurriculars", "interests", "gpa", "courses"]
 
 '''
@@ -39,43 +48,88 @@ school_name TEXT,
 email TEXT,
 auth_token TEXT UNIQUE,
 createdAt TEXT DEFAULT CURRENT_TIMESTAMP,
-'''
 
-def init_admins_table():
-    """Create admins table if it doesn't exist."""
-    try:
-        connection = sqlite3.connect('users.db')
-        cursor = connection.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS admins(
-                id TEXT PRIMARY KEY,
-                username TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                school_name TEXT NOT NULL,
-                email TEXT NOT NULL,
-                auth_token TEXT UNIQUE,
-                createdAt TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        connection.commit()
-        connection.close()
-        logger.info('Admins table ready')
-    except Exception as e:
-        logger.error(f'Error initializing admins table: {str(e)}', exc_info=True)
+Principals Table (maintained by triggers on users/admins):
+token TEXT PRIMARY KEY,
+role TEXT ('student' or 'admin'),
+principal_id TEXT (users.username or admins.id),
 
-init_admins_table()
+Revoked Sessions Table (see sessions.py):
+jti TEXT PRIMARY KEY,
+expiresAt INTEGER,
+'''
 
-def generate_auth_token():
+class TokenCache:
     """
-    Generate a unique authentication token for the user
+    Bounded LRU cache of auth token -> identity ({"username", "is_admin"}).
+    Entries expire after `ttl` seconds so changes made by other processes are
+    picked up eventually; changes made in this process invalidate explicitly.
+    Profile data is never cached here: with several workers, another process
+    may have changed it.
     """
-    try:
-        token = secrets.token_urlsafe(32)
-        logger.debug("Generated new authentication token")
-        return token
-    except Exception as e:
-        logger.error(f"Error generating auth token: {str(e)}", exc_info=True)
-        return None
+
+    def __init__(self, maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            # Hand out a copy so callers can't mutate the cached principal
+            return dict(entry[1])
+
+    def put(self, token, principal):
+        with self._lock:
+            self._entries[token] = (time.monotonic() + self.ttl, dict(principal))
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, token=None, username=None):
+        """Drop the entry for `token` and/or every entry belonging to `username`."""
+        with self._lock:
+            if token is not None:
+                self._entries.pop(token, None)
+            if username is not None:
+                stale = [t for t, (_, p) in self._entries.items() if p.get('username') == username]
+                for t in stale:
+                    del self._entries[t]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None
+            }
+
+
+token_cache = TokenCache()
+
+
+def token_cache_stats():
+    return token_cache.stats()
+
 
 def verify_structure(data):
     try:
@@ -95,17 +149,16 @@ def verify_structure(data):
 
 def username_exists(username):
     try:
-        connection = sqlite3.connect('users.db')
-        cursor = connection.cursor()
+        with pool.connection(USERS_DB) as connection:
+            cursor = connection.cursor()
 
-        cursor.execute(
-            """
-                SELECT * FROM users WHERE username = ?
-            """,(username,)
-        )
+            cursor.execute(
+                """
+                    SELECT 1 FROM users WHERE username = ?
+                """,(username,)
+            )
 
-        exists = cursor.fetchone()
-        connection.close()
+            exists = cursor.fetchone()
         
         if exists:
             logger.info(f"Username '{username}' already exists in database")
@@ -123,9 +176,6 @@ def username_exists(username):
 
 def signup_user(data):
     try:
-        connection = sqlite3.connect('users.db')
-        cursor = connection.cursor()
-
         username = data.get("username")
 
         if username_exists(username):
@@ -145,25 +195,19 @@ def signup_user(data):
         gpa = data.get("gpa")
         courses = data.get("courses")
 
-        # Generate authentication token
-        auth_token = generate_auth_token()
-        if not auth_token:
-            logger.error("Failed to generate authentication token during signup")
-            return False, None
-
-        cursor.execute(
-            """
-                INSERT INTO users (username, password, first_name, last_name, school, email_personal, email_school, age, grade, extracurriculars, interests, gpa, courses, auth_token)
-                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-            """,
-            (username, password, first_name, last_name, school, email_personal, email_school, int(age), int(grade), extracurriculars, interests, float(gpa) if gpa not in (None, '') else None, courses, auth_token)
-        )
-
-        connection.commit()
-        connection.close()
+        with pool.connection(USERS_DB) as connection:
+            cursor = connection.cursor()
+            cursor.execute(
+                """
+                    INSERT INTO users (username, password, first_name, last_name, school, email_personal, email_school, age, grade, extracurriculars, interests, gpa, courses)
+                    VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)
+                """,
+                (username, password, first_name, last_name, school, email_personal, email_school, int(age), int(grade), extracurriculars, interests, float(gpa) if gpa not in (None, '') else None, courses)
+            )
 
+        token_cache.invalidate(username=username)
         logger.info(f"Successfully added user: {username}")
-        return True, auth_token
+        return True, sessions.issue(username, 'student')
     except sqlite3.IntegrityError as e:
         logger.error(f"Database integrity error during signup: {str(e)}", exc_info=True)
         return False, None
@@ -205,30 +249,47 @@ def verify_password(stored_password, provided_password):
         logger.error(f"Error verifying password: {str(e)}", exc_info=True)
         return False
 
+def retire_legacy_token(table, username):
+    """
+    Clear the opaque pre-session token of an account that just got a session
+    token, so it can't outlive the switch. `table` is 'users' or 'admins'.
+    """
+    if table not in ("users", "admins"):
+        raise ValueError(f"Unknown account table {table!r}")
+    with pool.connection(USERS_DB) as connection:
+        cursor = connection.cursor()
+        cursor.execute(f"UPDATE {table} SET auth_token = NULL WHERE username = ? AND auth_token IS NOT NULL", (username,))
+        retired = cursor.rowcount
+    if retired:
+        token_cache.invalidate(username=username)
+        logger.info(f"Retired legacy auth token of {username}")
+    return retired > 0
+
 def login_user(username, password):
     try:
-        connection = sqlite3.connect('users.db')
-        cursor = connection.cursor()
+        with pool.connection(USERS_DB) as connection:
+            cursor = connection.cursor()
 
-        cursor.execute(
-            """
-                SELECT username, password, first_name, last_name, school, auth_token FROM users WHERE username = ?
-            """, (username,)
-        )
+            cursor.execute(
+                """
+                    SELECT username, password, first_name, last_name, school FROM users WHERE username = ?
+                """, (username,)
+            )
 
-        user = cursor.fetchone()
-        connection.close()
+            user = cursor.fetchone()
 
         if not user:
             logger.warning(f"Login attempt failed: username '{username}' not found")
             return False, None
 
-        stored_username, stored_password, first_name, last_name, school, auth_token = user
+        stored_username, stored_password, first_name, last_name, school = user
 
         if not verify_password(stored_password, password):
             logger.warning(f"Login attempt failed: incorrect password for username '{username}'")
             return False, None
 
+        auth_token = sessions.issue(stored_username, 'student')
+        retire_legacy_token("users", stored_username)
         logger.info(f"Successful login for user: {username}")
         return True, {
             "username": stored_username,
@@ -263,62 +324,133 @@ def initiate_login(username, password):
         return False, None
 
 
-def get_user_by_token(auth_token):
-    """Return user row/dict for given auth_token, or None. Checks both users and admins tables."""
-    try:
-        if not auth_token:
-            return None
-        connection = sqlite3.connect('users.db')
-        cursor = connection.cursor()
-
-        # First check users table
-        cursor.execute(
-            """
-                SELECT username, first_name, last_name, school, email_personal, email_school, age, grade, extracurriculars, interests, gpa, courses
-                FROM users WHERE auth_token = ?
-            """, (auth_token,)
-        )
-        row = cursor.fetchone()
-
-        if row:
-            (username, first_name, last_name, school, email_personal, email_school, age, grade, extracurriculars, interests, gpa, courses) = row
-            connection.close()
-            return {
-                "username": username,
-                "first_name": first_name,
-                "last_name": last_name,
-                "school": school,
-                "email_personal": email_personal,
-                "email_school": email_school,
-                "age": age,
-                "grade": grade,
-                "extracurriculars": extracurriculars,
-                "interests": interests,
-                "gpa": gpa,
-                "courses": courses
-            }
-
-        # If not found in users table, check admins table
-        cursor.execute(
-            """
-                SELECT username, school_name, email FROM admins WHERE auth_token = ?
-            """, (auth_token,)
-        )
-        admin_row = cursor.fetchone()
-        connection.close()
-
-        if admin_row:
-            (username, school_name, email) = admin_row
-            logger.debug(f"Admin found for token: {username}")
+# Resolves a legacy opaque token to a student or an admin in one indexed lookup (see the principals table)
+PRINCIPAL_QUERY = f"""
+    SELECT p.role, {', '.join('u.' + c for c in PROFILE_COLUMNS)}, a.username, a.school_name, a.email
+    FROM principals p
+    LEFT JOIN users u ON p.role = 'student' AND u.username = p.principal_id
+    LEFT JOIN admins a ON p.role = 'admin' AND a.id = p.principal_id
+    WHERE p.token = ?
+"""
+
+# Same row shape for a session token's (role, username)
+SESSION_PRINCIPAL_QUERY = f"""
+    SELECT ?1, {', '.join('u.' + c for c in PROFILE_COLUMNS)}, a.username, a.school_name, a.email
+    FROM (SELECT 1)
+    LEFT JOIN users u ON ?1 = 'student' AND u.username = ?2
+    LEFT JOIN admins a ON ?1 = 'admin' AND a.username = ?2
+"""
+
+
+def _principal_from_row(row):
+    role = row[0]
+    if role == 'student' and row[1] is not None:
+        return dict(zip(PROFILE_COLUMNS, row[1:1 + len(PROFILE_COLUMNS)]))
+    if role == 'admin':
+        username, school_name, email = row[1 + len(PROFILE_COLUMNS):]
+        if username is not None:
             return {
                 "username": username,
                 "school_name": school_name,
                 "email": email,
                 "is_admin": True
             }
+    return None
+
 
-        logger.debug(f"No user or admin found for token")
+def _token_claims(auth_token):
+    """
+    (accepted, claims): claims of a valid session token, or None for a legacy
+    opaque token that is still accepted (see sessions.legacy_tokens_allowed).
+    """
+    if not auth_token:
+        return False, None
+    if sessions.is_session_token(auth_token):
+        claims = sessions.verify(auth_token)
+        return claims is not None, claims
+    return sessions.legacy_tokens_allowed(), None
+
+
+
+def _identity(principal):
+    return {"username": principal['username'], "is_admin": bool(principal.get('is_admin'))}
+
+def resolve_principal(auth_token):
+    """
+    Student profile dict or admin dict (is_admin=True) for auth_token, or
+    None. Always read from the database. Raises sqlite3.Error.
+    """
+    accepted, claims = _token_claims(auth_token)
+    if not accepted:
+        return None
+    with pool.connection(USERS_DB) as connection:
+        if claims is None:
+            row = connection.execute(PRINCIPAL_QUERY, (auth_token,)).fetchone()
+        else:
+            row = connection.execute(SESSION_PRINCIPAL_QUERY, (claims['role'], claims['sub'])).fetchone()
+    principal = _principal_from_row(row) if row else None
+    # Only opaque tokens go through the cache; session tokens carry their identity
+    if principal is not None and claims is None:
+        token_cache.put(auth_token, _identity(principal))
+    return principal
+
+
+def get_identity_by_token(auth_token):
+    """
+    {"username", "is_admin"} for auth_token, or None. Session tokens are
+    checked from their signature alone; legacy tokens need the lookup.
+    """
+    try:
+        accepted, claims = _token_claims(auth_token)
+        if not accepted:
+            return None
+        if claims is not None:
+            return {"username": claims['sub'], "is_admin": claims['role'] == 'admin'}
+        cached = token_cache.get(auth_token)
+        if cached is not None:
+            return cached
+        principal = resolve_principal(auth_token)
+        return _identity(principal) if principal is not None else None
+    except Exception as e:
+        logger.error(f"Unexpected error checking token: {str(e)}", exc_info=True)
         return None
+
+
+def logout(auth_token):
+    """
+    End the session of auth_token. Session tokens are revoked; a legacy token
+    is cleared from its account. Returns False if the token wasn't valid.
+    """
+    try:
+        accepted, claims = _token_claims(auth_token)
+        if not accepted:
+            return False
+        if claims is not None:
+            sessions.revoke(claims)
+            token_cache.invalidate(token=auth_token)
+            return True
+        with pool.connection(USERS_DB) as connection:
+            cursor = connection.cursor()
+            cursor.execute("UPDATE users SET auth_token = NULL WHERE auth_token = ?", (auth_token,))
+            cleared = cursor.rowcount
+            cursor.execute("UPDATE admins SET auth_token = NULL WHERE auth_token = ?", (auth_token,))
+            cleared += cursor.rowcount
+        token_cache.invalidate(token=auth_token)
+        return cleared > 0
+    except Exception as e:
+        logger.error(f"Error logging out token: {str(e)}", exc_info=True)
+        return False
+
+
+def get_user_by_token(auth_token):
+    """Return user row/dict for given auth_token, or None. Checks both users and admins."""
+    try:
+        principal = resolve_principal(auth_token)
+        if principal is None:
+            logger.debug(f"No user or admin found for token")
+        elif principal.get('is_admin'):
+            logger.debug(f"Admin found for token: {principal['username']}")
+        return principal
     except sqlite3.Error as e:
         logger.error(f"Database error looking up token: {str(e)}", exc_info=True)
         return None
@@ -330,9 +462,6 @@ def get_user_by_token(auth_token):
 def admin_signup(data):
     """Create a new admin account for school/institution."""
     try:
-        connection = sqlite3.connect('users.db')
-        cursor = connection.cursor()
-
         username = data.get("username")
         password = data.get("password")
         school_name = data.get("school_name")
@@ -342,28 +471,24 @@ def admin_signup(data):
             logger.warning("Admin signup missing required fields")
             return False, None
 
-        # Check if admin exists
-        cursor.execute("SELECT * FROM admins WHERE username = ?", (username,))
-        if cursor.fetchone():
-            logger.warning(f"Admin signup failed: username '{username}' already exists")
-            connection.close()
-            return False, None
+        with pool.connection(USERS_DB) as connection:
+            cursor = connection.cursor()
 
-        auth_token = generate_auth_token()
-        if not auth_token:
-            connection.close()
-            return False, None
+            # Check if admin exists
+            cursor.execute("SELECT 1 FROM admins WHERE username = ?", (username,))
+            if cursor.fetchone():
+                logger.warning(f"Admin signup failed: username '{username}' already exists")
+                return False, None
 
-        admin_id = str(secrets.token_hex(8))
-        cursor.execute("""
-            INSERT INTO admins (id, username, password, school_name, email, auth_token)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (admin_id, username, password, school_name, email, auth_token))
+            admin_id = str(secrets.token_hex(8))
+            cursor.execute("""
+                INSERT INTO admins (id, username, password, school_name, email)
+                VALUES (?, ?, ?, ?, ?)
+            """, (admin_id, username, password, school_name, email))
 
-        connection.commit()
-        connection.close()
+        token_cache.invalidate(username=username)
         logger.info(f"Admin account created: {username} ({school_name})")
-        return True, auth_token
+        return True, sessions.issue(username, 'admin')
     except sqlite3.IntegrityError as e:
         logger.error(f"Admin signup integrity error: {str(e)}", exc_info=True)
         return False, None
@@ -375,26 +500,27 @@ def admin_signup(data):
 def admin_login(username, password):
     """Login admin and return auth token."""
     try:
-        connection = sqlite3.connect('users.db')
-        cursor = connection.cursor()
+        with pool.connection(USERS_DB) as connection:
+            cursor = connection.cursor()
 
-        cursor.execute("""
-            SELECT username, password, school_name, email, auth_token FROM admins WHERE username = ?
-        """, (username,))
+            cursor.execute("""
+                SELECT username, password, school_name, email FROM admins WHERE username = ?
+            """, (username,))
 
-        admin = cursor.fetchone()
-        connection.close()
+            admin = cursor.fetchone()
 
         if not admin:
             logger.warning(f"Admin login failed: username '{username}' not found")
             return False, None
 
-        stored_username, stored_password, school_name, email, auth_token = admin
+        stored_username, stored_password, school_name, email = admin
 
         if not verify_password(stored_password, password):
             logger.warning(f"Admin login failed: incorrect password for username '{username}'")
             return False, None
 
+        auth_token = sessions.issue(stored_username, 'admin')
+        retire_legacy_token("admins", stored_username)
         logger.info(f"Admin login successful: {username}")
         return True, {
             "username": stored_username,
@@ -413,7 +539,8 @@ def admin_login(username, password):
 def update_user_by_token(auth_token, data):
     """Update allowed user fields for the user identified by auth_token."""
     try:
-        if not auth_token:
+        accepted, claims = _token_claims(auth_token)
+        if not accepted or (claims is not None and claims['role'] != 'student'):
             return False
         allowed = {"first_name", "last_name", "school", "email_personal", "email_school", "age", "grade", "extracurriculars", "interests", "gpa", "courses"}
         to_set = {}
@@ -424,8 +551,6 @@ def update_user_by_token(auth_token, data):
         if not to_set:
             return False
 
-        connection = sqlite3.connect('users.db')
-        cursor = connection.cursor()
         parts = []
         params = []
         for k, v in to_set.items():
@@ -438,23 +563,26 @@ def update_user_by_token(auth_token, data):
             else:
                 params.append(v)
 
-        params.append(auth_token)
-        sql = f"UPDATE users SET {', '.join(parts)} WHERE auth_token = ?"
-        cursor.execute(sql, tuple(params))
-        connection.commit()
-        connection.close()
-
-        # After updating DB, write a JSON copy of the user's profile to disk
-        try:
-            user = get_user_by_token(auth_token)
-            if user and user.get('username'):
-                os.makedirs('profile_data', exist_ok=True)
-                path = os.path.join('profile_data', f"{user['username']}.json")
-                with open(path, 'w', encoding='utf-8') as fh:
-                    json.dump(user, fh, ensure_ascii=False, indent=2)
-                logger.info(f'Wrote profile JSON for user {user.get("username")} to {path}')
-        except Exception:
-            logger.exception('Failed to write profile JSON file')
+        # Every change gets a new version, which GET /api/profile uses as its ETag
+        parts.append("profile_version = profile_version + 1")
+        if claims is None:
+            where = "auth_token = ?"
+            params.append(auth_token)
+        else:
+            where = "username = ?"
+            params.append(claims['sub'])
+        # RETURNING gives the updated profile without a second query
+        sql = f"UPDATE users SET {', '.join(parts)} WHERE {where} RETURNING {', '.join(PROFILE_COLUMNS)}"
+        with pool.connection(USERS_DB) as connection:
+            cursor = connection.cursor()
+            cursor.execute(sql, tuple(params))
+            row = cursor.fetchone()
+        if not row:
+            return False
+
+        # Write a JSON copy of the user's profile to disk in the background
+        user = dict(zip(PROFILE_COLUMNS, row))
+        profile_snapshots.schedule(user['username'], user)
 
         return True
     except Exception as e:
@@ -465,27 +593,14 @@ def update_user_by_token(auth_token, data):
 def get_admin_by_token(auth_token):
     """Return admin data by auth token."""
     try:
-        if not auth_token:
-            return None
-        connection = sqlite3.connect('users.db')
-        cursor = connection.cursor()
-
-        cursor.execute("""
-            SELECT username, school_name, email FROM admins WHERE auth_token = ?
-        """, (auth_token,))
-
-        row = cursor.fetchone()
-        connection.close()
-
-        if not row:
+        principal = resolve_principal(auth_token)
+        if not principal or not principal.get('is_admin'):
             logger.debug("No admin found for token")
             return None
-
-        username, school_name, email = row
         return {
-            "username": username,
-            "school_name": school_name,
-            "email": email
+            "username": principal["username"],
+            "school_name": principal["school_name"],
+            "email": principal["email"]
         }
     except sqlite3.Error as e:
         logger.error(f"Error looking up admin token: {str(e)}", exc_info=True)
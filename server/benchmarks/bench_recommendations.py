@@ -0,0 +1,65 @@
+"""
+End-to-end latency of get_student_recommendations with no network.
+
+Copies users.db and internships.db into a temporary directory, switches the
+recommender to the deterministic local LLM backend and times repeated calls,
+with the result cache cleared (cold) and kept (warm).
+
+Run from the server directory:
+    python benchmarks/bench_recommendations.py --user simoncrabb
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", default="simoncrabb")
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("users.db", "internships.db"):
+            shutil.copy(os.path.join(SERVER_DIR, name), tmp)
+        os.chdir(tmp)
+
+        import llm_backends
+        import llamaquery_ai
+        import database.recommendations as recommendations_cache
+        from database import migrations, pool
+
+        migrations.run_migrations()
+        llm_backends.set_backend(llm_backends.LocalBackend())
+
+        for label, clear in (("cold (no result cache)", True), ("warm (cached)", False)):
+            samples = []
+            for _ in range(args.iterations):
+                if clear:
+                    recommendations_cache.invalidate(args.user)
+                start = time.perf_counter()
+                result = llamaquery_ai.get_student_recommendations(args.user)
+                samples.append((time.perf_counter() - start) * 1000)
+                if not result.get("success"):
+                    sys.exit(f"Recommendation failed: {result}")
+            print(f"{label:<24} mean {statistics.mean(samples):7.2f} ms   p50 {percentile(samples, 50):7.2f} ms"
+                  f"   p95 {percentile(samples, 95):7.2f} ms")
+
+        print("\nLLM latency:", llm_backends.latency_stats())
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
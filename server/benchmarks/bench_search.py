@@ -0,0 +1,105 @@
+"""
+Compare /api/internships?q= search latency: LIKE scan vs the FTS5 index.
+
+Builds a synthetic catalogue in a temporary database and times both search
+paths for a handful of typical queries.
+
+Run from the server directory:
+    python benchmarks/bench_search.py --rows 100000
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database.internships as internships_module
+from database import migrations, pool
+
+WORDS = [
+    "marine", "science", "robotics", "engineering", "biology", "leadership", "music",
+    "summer", "research", "camp", "medicine", "coding", "journalism", "economics",
+    "theatre", "chemistry", "language", "outdoor", "design", "physics", "history",
+    "mathematics", "business", "environmental", "art", "writing", "community",
+]
+# Long tail of filler terms so term frequencies look like real prose (Zipf-ish);
+# the topical words sit mid-distribution rather than at the head.
+FILLER = [f"term{i}" for i in range(20000)]
+VOCABULARY = FILLER[:200] + WORDS + FILLER[200:]
+CUM_WEIGHTS = list(itertools.accumulate(1.0 / (rank + 10) for rank in range(len(VOCABULARY))))
+CATEGORIES = ["STEM", "Humanities", "Business", "Arts", "Civics", "Health"]
+QUERIES = ["marine", "robot", "summer research", "leadership camp", "zzznomatch"]
+
+INSERT_SQL = """
+    INSERT INTO internships (id, name, organization, Url, contact, deadline, category, location, description, creatorId)
+    VALUES (?,?,?,?,?,?,?,?,?,?)
+"""
+
+
+def words(rng, k):
+    return " ".join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=k))
+
+
+def fill_catalogue(rows):
+    rng = random.Random(42)
+    batch = []
+    with pool.connection(internships_module.DB_NAME) as connection:
+        cursor = connection.cursor()
+        for _ in range(rows):
+            name = words(rng, 3).title() + " Program"
+            organization = rng.choice(VOCABULARY).title() + " Institute"
+            batch.append((str(uuid.uuid4()), name, organization, "http://example.com", "contact@example.com",
+                          "nan", rng.choice(CATEGORIES), "nan", words(rng, 40), "system"))
+            if len(batch) == 5000:
+                cursor.executemany(INSERT_SQL, batch)
+                batch = []
+        if batch:
+            cursor.executemany(INSERT_SQL, batch)
+
+
+def timed(fn, query, repeat):
+    best = float("inf")
+    hits = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        hits = len(fn(query))
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        internships_module.DB_NAME = os.path.join(tmp, "internships.db")
+        # Current schema, including deletedAt and the FTS index and its triggers
+        migrations.migrate(internships_module.DB_NAME, migrations.INTERNSHIPS_MIGRATIONS)
+
+        start = time.perf_counter()
+        fill_catalogue(args.rows)
+        print(f"Loaded and indexed {args.rows} rows in {time.perf_counter() - start:.1f}s")
+        start = time.perf_counter()
+        internships_module.init_search_index()
+        print(f"Checked search index in {time.perf_counter() - start:.1f}s\n")
+
+        print(f"{'query':<20}{'LIKE ms':>10}{'FTS ms':>10}{'top50 ms':>10}{'speedup':>10}{'LIKE hits':>11}{'FTS hits':>10}")
+        for query in QUERIES:
+            like_ms, like_hits = timed(internships_module.search_internships_like, query, args.repeat)
+            fts_ms, fts_hits = timed(internships_module.search_internships, query, args.repeat)
+            top_ms, _ = timed(lambda q: internships_module.search_internships(q, limit=50), query, args.repeat)
+            speedup = like_ms / fts_ms if fts_ms else float("inf")
+            print(f"{query:<20}{like_ms:>10.2f}{fts_ms:>10.2f}{top_ms:>10.2f}{speedup:>9.1f}x{like_hits:>11}{fts_hits:>10}")
+
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
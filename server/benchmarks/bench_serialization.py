@@ -0,0 +1,79 @@
+"""
+Compare list-response encoding: per-row dicts + Flask jsonify (the old
+/api/internships path) vs serialization.json_response with the stdlib
+encoder and with orjson (when installed).
+
+Rows are synthetic tuples shaped like the internships table; no database
+is touched.
+
+Run from the server directory:
+    python benchmarks/bench_serialization.py --sizes 1000 10000 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+import serialization
+import database.internships as internships_module
+
+CATEGORIES = ["STEM", "Humanities", "Business", "Art", "Civics", "Medicine"]
+
+
+def make_rows(count):
+    rng = random.Random(7)
+    return [
+        (f"{i:08x}-0000-4000-8000-000000000000", f"Summer Program {i}", f"Institute {i % 500}",
+         "http://example.com", "contact@example.com", "6/23-8/3", rng.choice(CATEGORIES), "VA",
+         "Hands-on research with mentors, lectures and a final poster session. " * 3,
+         "system", "2025-12-07 21:04:12", "2025-12-07 21:04:12")
+        for i in range(count)
+    ]
+
+
+def jsonify_path(rows):
+    internships = [dict(zip(internships_module.COLUMNS, r)) for r in rows]
+    return jsonify({"success": True, "internships": internships}).get_data()
+
+
+def rows_path(rows):
+    return serialization.json_response({"success": True}, rows=rows,
+                                       columns=internships_module.COLUMNS, key="internships").get_data()
+
+
+def timed(fn, rows, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    orjson = serialization.orjson
+    with app.app_context():
+        print(f"{'rows':>8} {'jsonify':>12} {'stdlib rows':>12} {'orjson rows':>12}")
+        for size in args.sizes:
+            rows = make_rows(size)
+            baseline = timed(jsonify_path, rows, args.repeat)
+            serialization.orjson = None
+            stdlib = timed(rows_path, rows, args.repeat)
+            serialization.orjson = orjson
+            fast = f"{timed(rows_path, rows, args.repeat):9.1f} ms" if orjson else "   (missing)"
+            print(f"{size:>8} {baseline:9.1f} ms {stdlib:9.1f} ms {fast}")
+
+
+if __name__ == "__main__":
+    main()
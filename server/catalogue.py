@@ -0,0 +1,129 @@
+import re
+import sys
+import threading
+import logging
+from collections import Counter
+from database import pool
+import database.internships as internships_module
+
+logger = logging.getLogger(__name__)
+
+'''
+In-process snapshot of the live catalogue.
+
+The catalogue changes rarely (admin adds, CSV ingest/sync) and every change
+bumps its version, so reads are served from an immutable snapshot built once
+per version: one tuple per column plus inverted indexes by category,
+location and deadline month. A new version builds a new snapshot and swaps
+the module reference, so readers always see one whole snapshot.
+'''
+
+# Columns with a few repeated values get an inverted index (and interned strings)
+INDEXED_COLUMNS = ("category", "location")
+
+MONTHS = ("January", "February", "March", "April", "May", "June", "July", "August",
+          "September", "October", "November", "December")
+# Capitalized names or abbreviations ("may vary" is not May), or a numeric 6/23
+MONTH_RE = re.compile(r"\b(?:(" + "|".join(m for name in MONTHS for m in (name, name[:3]))
+                      + r"|Sept)|(1[0-2]|0?[1-9])/\d{1,2})\b")
+
+
+def deadline_month(deadline):
+    """
+    First month (1-12) a free-text deadline mentions, e.g. "6/23-8/3" -> 6 or
+    "mid June - August" -> 6; None when there is none ("Rolling", "nan").
+    """
+    match = MONTH_RE.search(str(deadline or ""))
+    if not match:
+        return None
+    if match.group(1):
+        return [name[:3] for name in MONTHS].index(match.group(1)[:3]) + 1
+    return int(match.group(2))
+
+
+def _invert(values):
+    index = {}
+    for position, value in enumerate(values):
+        if value not in (None, ""):
+            index.setdefault(value, []).append(position)
+    return {value: tuple(positions) for value, positions in index.items()}
+
+
+def _counts(index):
+    """[{"value": ..., "count": ...}] from an inverted index, most common first."""
+    counts = Counter({value: len(positions) for value, positions in index.items()})
+    return [{"value": value, "count": count} for value, count in counts.most_common()]
+
+
+class CatalogueSnapshot:
+    """Read-only view of one catalogue version. Never mutated after __init__."""
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.size = len(rows)
+        columns = list(zip(*rows)) if rows else [()] * len(internships_module.COLUMNS)
+        self.columns = {}
+        for name, values in zip(internships_module.COLUMNS, columns):
+            if name in INDEXED_COLUMNS:
+                values = [sys.intern(v) if isinstance(v, str) else v for v in values]
+            self.columns[name] = tuple(values)
+
+        self.by_category = _invert(self.columns["category"])
+        self.by_location = _invert(self.columns["location"])
+        self.by_deadline_month = _invert([deadline_month(d) for d in self.columns["deadline"]])
+        self.facets = {
+            "category": _counts(self.by_category),
+            "location": _counts(self.by_location),
+            "deadline_month": _counts(self.by_deadline_month),
+        }
+
+    def rows(self, positions=None):
+        """Rows in internships_module.COLUMNS order (all rows when positions is None)."""
+        if positions is None:
+            positions = range(self.size)
+        columns = [self.columns[name] for name in internships_module.COLUMNS]
+        return [tuple(column[p] for column in columns) for p in positions]
+
+    def filter(self, category=None, location=None, month=None):
+        """Row positions matching every given filter, in catalogue order."""
+        selected = None
+        for index, value in ((self.by_category, category), (self.by_location, location),
+                             (self.by_deadline_month, month)):
+            if value is None:
+                continue
+            positions = index.get(value, ())
+            selected = set(positions) if selected is None else selected.intersection(positions)
+        if selected is None:
+            return range(self.size)
+        return sorted(selected)
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot(catalogue_version=None):
+    """
+    The snapshot for the current catalogue version, rebuilt only when the
+    version moved. Pass a version already read by the caller to reuse it;
+    a caller holding an older version gets the newer snapshot rather than
+    rebuilding (and swapping in) an old one.
+    """
+    global _snapshot
+    if catalogue_version is None:
+        catalogue_version = internships_module.get_catalogue_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version >= catalogue_version:
+        return snapshot
+    with _snapshot_lock:
+        snapshot = _snapshot
+        if snapshot is not None and snapshot.version >= catalogue_version:
+            return snapshot
+        with pool.connection(internships_module.DB_NAME) as connection:
+            rows = connection.execute(
+                f"SELECT {internships_module.SELECT_COLUMNS} FROM internships WHERE deletedAt IS NULL ORDER BY rowid"
+            ).fetchall()
+        snapshot = CatalogueSnapshot(catalogue_version, rows)
+        _snapshot = snapshot
+        logger.info(f"Built catalogue snapshot v{catalogue_version} ({snapshot.size} internships)")
+        return snapshot
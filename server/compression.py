@@ -0,0 +1,139 @@
+import os
+import gzip
+import threading
+import logging
+from collections import OrderedDict
+from flask import request
+
+logger = logging.getLogger(__name__)
+
+'''
+Negotiated response compression for the Flask app.
+
+init_app(app) registers an after_request hook that compresses JSON/text
+bodies with brotli (when the brotli package is installed and the client
+accepts it) or gzip. Small bodies, streamed responses (the catalogue
+export compresses itself) and anything already encoded are left alone.
+
+Catalogue responses carry an ETag derived from the catalogue version, so
+their compressed bytes are cached under (path, ETag, encoding): an unchanged
+snapshot is compressed once, not on every request.
+'''
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_SIZE = int(os.environ.get("INTERNNET_COMPRESS_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.environ.get("INTERNNET_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("INTERNNET_BROTLI_QUALITY", "5"))
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+# Only bodies whose ETag pins their exact content are cached
+CACHEABLE_ETAG_PREFIXES = ("catalogue-",)
+CACHE_ENTRIES = int(os.environ.get("INTERNNET_COMPRESS_CACHE_ENTRIES", "64"))
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def etag_variants(etag):
+    """An ETag as sent for each encoding; If-None-Match may hold any of them."""
+    return [etag] + [f"{etag}-{encoding}" for encoding in ("gzip", "br")]
+
+
+class CompressedBodyCache:
+    """Small LRU of compressed bodies keyed by (path, etag, encoding)."""
+
+    def __init__(self, maxsize=CACHE_ENTRIES):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+body_cache = CompressedBodyCache()
+
+
+def choose_encoding(accept_encodings):
+    """Best encoding a parsed Accept-Encoding header allows, or None."""
+    if brotli is not None and accept_encodings["br"] > 0:
+        return "br"
+    if accept_encodings["gzip"] > 0:
+        return "gzip"
+    return None
+
+
+def compress_response(response, request):
+    """Compress `response` in place for `request` if it is worth it."""
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code >= 300 or response.status_code == 204
+            or "Content-Encoding" in response.headers
+            or not (response.mimetype or "").startswith(COMPRESSIBLE_TYPES)):
+        return response
+    response.vary.add("Accept-Encoding")
+
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None or response.content_length is None or response.content_length < MIN_SIZE:
+        return response
+
+    etag, weak = response.get_etag()
+    key = None
+    if etag and not weak and etag.startswith(CACHEABLE_ETAG_PREFIXES):
+        # The path too: an ETag is only unique per resource
+        key = (request.path, etag, encoding)
+    body = body_cache.get(key) if key else None
+    if body is None:
+        body = compress(response.get_data(), encoding)
+        if key:
+            body_cache.put(key, body)
+
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    if etag:
+        # A different representation needs a different strong ETag
+        response.set_etag(f"{etag}-{encoding}", weak=weak)
+    return response
+
+
+def init_app(app):
+    """Compress eligible responses of `app`."""
+    @app.after_request
+    def _compress_after_request(response):
+        try:
+            return compress_response(response, request)
+        except Exception as e:
+            logger.error(f"Response compression failed: {str(e)}", exc_info=True)
+            return response
+    return app
+
+
+def stats():
+    return {"brotli": brotli is not None, "min_size": MIN_SIZE, "cache": body_cache.stats()}
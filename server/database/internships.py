@@ -1,30 +1,33 @@
-import sqlite3
 import pandas as pd
 import uuid
+import re
+import sqlite3
+import logging
+import json
+import base64
+import hashlib
+from database import pool
+
+logger = logging.getLogger(__name__)
 
 # Don't run this unless database breaks
 DB_NAME = "internships.db"
 
-def initiate():
+# Public columns of the internships table, in the order reads return them
+COLUMNS = ("id", "name", "organization", "Url", "contact", "deadline", "category",
+           "location", "description", "creatorId", "createdAt", "updatedAt")
+SELECT_COLUMNS = ", ".join(COLUMNS)
 
-    # read local CSV (if you want to repopulate DB). Path is relative to this file.
-    df = pd.read_csv(r"fixed_jobs_data.csv")
-    connection = sqlite3.connect("internships.db")
-    cursor = connection.cursor()
-    df.iloc[271:341]
-
-    Organization = df["Institution Name"]
-    Name = df["Program Name"]
-    Deadline = df["Deadline"]
-    Category = df["AI_Category"]
-    Location = df["Geographic Location"]
-    Age = df["Age Category"]
-    Cost = df["Cost Type"]
-    Url = df["Website Address"]
+# Columns compared by catalogue sync to decide whether a program changed
+CONTENT_COLUMNS = ("name", "organization", "Url", "contact", "deadline", "category",
+                   "location", "description")
 
+# Spellings of "no value" found in the table: the CSV loader writes N/A or
+# NULL, older loads stored pandas' nan and a placeholder contact address
+MISSING_MARKERS = ("", "nan", "n/a", "none")
+PLACEHOLDER_VALUES = {"contact": ("contact@example.com",)}
 
-    cursor.execute(
-    """
+INTERNSHIPS_DDL = """
     CREATE TABLE IF NOT EXISTS internships(
         id TEXT PRIMARY KEY,
         name TEXT NOT NULL,
@@ -36,74 +39,325 @@ def initiate():
         location TEXT NOT NULL,
         description TEXT NOT NULL,
         creatorId TEXT NOT NULL,
-        createdAt TEXT D
-        EFAULT CURRENT_TIMESTAMP,
+        createdAt TEXT DEFAULT CURRENT_TIMESTAMP,
         updatedAt TEXT DEFAULT CURRENT_TIMESTAMP
     )
-    """)
+"""
 
-    connection.commit()
-    connection.close()
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def initiate():
+
+    # read local CSV (if you want to repopulate DB). Path is relative to this file.
+    df = pd.read_csv(r"fixed_jobs_data.csv")
+    df.iloc[271:341]
+
+    Organization = df["Institution Name"]
+    Name = df["Program Name"]
+    Deadline = df["Deadline"]
+    Category = df["AI_Category"]
+    Location = df["Geographic Location"]
+    Age = df["Age Category"]
+    Cost = df["Cost Type"]
+    Url = df["Website Address"]
+
+    initiate_schema()
+
+def initiate_schema():
+    """Bring DB_NAME up to the current internships schema (INTERNSHIPS_DDL alone is only version 1)."""
+    # Imported here: migrations imports this module
+    from database import migrations
+    migrations.migrate(DB_NAME, migrations.INTERNSHIPS_MIGRATIONS)
 
 def add_internship(data):
-    connection = sqlite3.connect("internships.db")
-    cursor = connection.cursor()
+    with pool.connection(DB_NAME) as connection:
+        cursor = connection.cursor()
+
+        cursor.execute("""
+            INSERT INTO internships (
+                id, name, organization, Url, contact, deadline, category, location, description, creatorId
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            data["id"],
+            data["name"],
+            data["organization"],
+            data.get("Url"),
+            data["contact"],
+            data["deadline"],
+            data["category"],
+            data["location"],
+            data["description"],
+            data["creatorId"]
+        ))
+        bump_catalogue_version(cursor)
 
+def get_catalogue_version():
+    """
+    Monotonic counter bumped whenever the catalogue changes.
+
+    Anything derived from the catalogue (ETags, snapshots, cached
+    recommendations) is tagged with a version read *before* the rows: the
+    bump commits together with the change (bump_catalogue_version), so a
+    concurrent change can only make the tag older than the data, which
+    just causes an extra refresh, never a stale result under a new tag.
+    """
+    with pool.connection(DB_NAME) as connection:
+        row = connection.execute("SELECT value FROM catalogue_meta WHERE key = 'version'").fetchone()
+    return row[0] if row else 0
+
+def bump_catalogue_version(cursor):
+    """Bump the catalogue version inside the caller's transaction."""
     cursor.execute("""
-        INSERT INTO internships (
-            id, name, organization, Url, contact, deadline, category, location, description, creatorId
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        data["id"],
-        data["name"],
-        data["organization"],
-        data.get("Url"),
-        data["contact"],
-        data["deadline"],
-        data["category"],
-        data["location"],
-        data["description"],
-        data["creatorId"]
-    ))
-
-    connection.commit()
-    connection.close()
+        INSERT INTO catalogue_meta (key, value) VALUES ('version', 1)
+        ON CONFLICT(key) DO UPDATE SET value = value + 1
+    """)
 
 def get_all_internships():
-    connection = sqlite3.connect("internships.db")
-    cursor = connection.cursor()
+    with pool.connection(DB_NAME) as connection:
+        cursor = connection.cursor()
 
-    cursor.execute("SELECT * FROM internships")
-    rows = cursor.fetchall()
+        cursor.execute(f"SELECT {SELECT_COLUMNS} FROM internships WHERE deletedAt IS NULL")
+        rows = cursor.fetchall()
 
-    connection.close()
     return rows
 
-def search_internships(keyword):
-    connection = sqlite3.connect("internships.db")
-    cursor = connection.cursor()
+def _normalize_key_part(value):
+    if value is None:
+        return ""
+    text = " ".join(str(value).split()).lower()
+    return "" if text in ("nan", "n/a", "none") else text
 
-    cursor.execute("""
-        SELECT * FROM internships
-        WHERE 
-            name LIKE ? OR 
-            organization LIKE ? OR 
-            description LIKE ?
-    """, (f"%{keyword}%", f"%{keyword}%", f"%{keyword}%"))
-
-    rows = cursor.fetchall()
-    connection.close()
+def content_key(organization, name, url):
+    """Stable identity of a catalogue program: institution, program name and URL."""
+    raw = "\x1f".join(_normalize_key_part(v) for v in (organization, name, url))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def normalize_content(values):
+    """
+    CONTENT_COLUMNS values as content_hash compares them: whitespace
+    collapsed; missing markers and placeholders blank; a description that
+    is only the generated fallback ("name" or "name - organization") blank.
+    """
+    raw = {c: "" if v is None else " ".join(str(v).split()) for c, v in zip(CONTENT_COLUMNS, values)}
+    normalized = {}
+    for column, text in raw.items():
+        if text.lower() in MISSING_MARKERS or text in PLACEHOLDER_VALUES.get(column, ()):
+            text = ""
+        normalized[column] = text
+    if raw["description"] in (raw["name"], f"{raw['name']} - {raw['organization']}"):
+        normalized["description"] = ""
+    return tuple(normalized[c] for c in CONTENT_COLUMNS)
+
+def content_hash(values):
+    """Fingerprint of a program's CONTENT_COLUMNS values (normalized), used to detect edits."""
+    raw = "\x1f".join(normalize_content(values))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def get_internships_by_ids(ids, batch_size=500):
+    """
+    Internship rows for the given ids (any order, unknown ids skipped), looked
+    up in batches of WHERE id IN (...). Soft-deleted rows are included so
+    things a student already tracks still resolve.
+    """
+    ids = list(dict.fromkeys(i for i in ids if i))
+    rows = []
+    with pool.connection(DB_NAME) as connection:
+        for offset in range(0, len(ids), batch_size):
+            batch = ids[offset:offset + batch_size]
+            placeholders = ", ".join("?" * len(batch))
+            rows.extend(connection.execute(
+                f"SELECT {SELECT_COLUMNS} FROM internships WHERE id IN ({placeholders})", batch
+            ).fetchall())
+    return rows
+
+def iter_internships(category=None, batch_size=1000):
+    """
+    Yield live internship rows in fetchmany() batches of `batch_size`. The
+    pooled connection (and its read snapshot) is held until the generator
+    is exhausted or closed, so callers must not leave it half-consumed.
+    """
+    sql = f"SELECT {SELECT_COLUMNS} FROM internships WHERE deletedAt IS NULL"
+    params = ()
+    if category:
+        sql += " AND category = ?"
+        params = (category,)
+    with pool.connection(DB_NAME) as connection:
+        cursor = connection.execute(sql + " ORDER BY rowid", params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+
+def encode_cursor(created_at, internship_id):
+    raw = json.dumps([created_at, internship_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(token):
+    """Inverse of encode_cursor. Raises ValueError on a malformed token."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        created_at, internship_id = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(created_at, str) or not isinstance(internship_id, str):
+        raise ValueError("Invalid cursor")
+    return created_at, internship_id
+
+def list_internships_page(limit=DEFAULT_PAGE_SIZE, cursor=None, fields=None, category=None):
+    """
+    One page of internships ordered by (createdAt, id), starting after `cursor`.
+    Returns (rows, next_cursor); rows only contain `fields` (default: every
+    column) and next_cursor is None on the last page.
+    """
+    fields = tuple(fields or COLUMNS)
+    unknown = [f for f in fields if f not in COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+    where = ["deletedAt IS NULL"]
+    params = []
+    if category:
+        where.append("category = ?")
+        params.append(category)
+    if cursor:
+        where.append("(createdAt, id) > (?, ?)")
+        params.extend(decode_cursor(cursor))
+
+    # createdAt and id are always fetched last so the next cursor can be built
+    sql = f"SELECT {', '.join(fields)}, createdAt, id FROM internships"
+    sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY createdAt, id LIMIT ?"
+    params.append(limit + 1)
+
+    with pool.connection(DB_NAME) as connection:
+        rows = connection.execute(sql, params).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][-2], rows[-1][-1])
+    return [row[:-2] for row in rows], next_cursor
+
+SEARCH_INDEX_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS internships_fts USING fts5(
+        name, organization, description,
+        content='internships', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS internships_fts_ai AFTER INSERT ON internships BEGIN
+        INSERT INTO internships_fts(rowid, name, organization, description)
+        VALUES (new.rowid, new.name, new.organization, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS internships_fts_ad AFTER DELETE ON internships BEGIN
+        INSERT INTO internships_fts(internships_fts, rowid, name, organization, description)
+        VALUES ('delete', old.rowid, old.name, old.organization, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS internships_fts_au AFTER UPDATE ON internships BEGIN
+        INSERT INTO internships_fts(internships_fts, rowid, name, organization, description)
+        VALUES ('delete', old.rowid, old.name, old.organization, old.description);
+        INSERT INTO internships_fts(rowid, name, organization, description)
+        VALUES (new.rowid, new.name, new.organization, new.description);
+    END
+    """,
+)
+
+def create_search_index(cursor, rebuild=False):
+    """
+    Create the FTS5 index that mirrors internships(name, organization, description)
+    and the triggers that keep it in sync. Rebuilds the index when asked, or if it
+    has drifted from the table (e.g. rows loaded before the index existed, or a
+    VACUUM that renumbered rowids).
+    """
+    for statement in SEARCH_INDEX_DDL:
+        cursor.execute(statement)
+    if not rebuild:
+        try:
+            cursor.execute("INSERT INTO internships_fts(internships_fts, rank) VALUES ('integrity-check', 1)")
+        except sqlite3.DatabaseError:
+            rebuild = True
+    if rebuild:
+        logger.info('Rebuilding internships search index')
+        cursor.execute("INSERT INTO internships_fts(internships_fts) VALUES ('rebuild')")
+
+def init_search_index():
+    """Verify (and if needed rebuild) the search index. See create_search_index."""
+    try:
+        with pool.connection(DB_NAME) as connection:
+            create_search_index(connection.cursor())
+        return True
+    except sqlite3.Error as e:
+        logger.error(f'Could not initialize internships search index: {str(e)}', exc_info=True)
+        return False
+
+def build_match_query(keyword):
+    """Turn free text into an FTS5 query: every word must match, as a prefix."""
+    terms = re.findall(r"\w+", keyword or "")
+    return " ".join(f'"{term}"*' for term in terms)
+
+def search_internships(keyword, limit=None):
+    """
+    Full-text search over name, organization and description, best matches
+    first (BM25). Each row is the internships row followed by a snippet of
+    the matching text. Falls back to LIKE if the FTS index is unavailable.
+    """
+    match = build_match_query(keyword)
+    if not match:
+        return []
+    try:
+        with pool.connection(DB_NAME) as connection:
+            cursor = connection.cursor()
+
+            cursor.execute(f"""
+                SELECT {", ".join("i." + c for c in COLUMNS)},
+                       snippet(internships_fts, -1, '<mark>', '</mark>', '...', 12)
+                FROM internships_fts
+                JOIN internships i ON i.rowid = internships_fts.rowid
+                WHERE internships_fts MATCH ? AND i.deletedAt IS NULL
+                ORDER BY bm25(internships_fts, 10.0, 5.0, 1.0)
+                LIMIT ?
+            """, (match, limit if limit is not None else -1))
+
+            rows = cursor.fetchall()
+        return rows
+    except sqlite3.OperationalError as e:
+        logger.warning(f'Full-text search unavailable, falling back to LIKE: {str(e)}')
+        # Same row shape as the FTS path, without a snippet
+        rows = [row + (None,) for row in search_internships_like(keyword)]
+        return rows[:limit] if limit is not None else rows
+
+def search_internships_like(keyword):
+    with pool.connection(DB_NAME) as connection:
+        cursor = connection.cursor()
+
+        cursor.execute(f"""
+            SELECT {SELECT_COLUMNS} FROM internships
+            WHERE deletedAt IS NULL AND (
+                name LIKE ? OR 
+                organization LIKE ? OR 
+                description LIKE ?)
+        """, (f"%{keyword}%", f"%{keyword}%", f"%{keyword}%"))
+
+        rows = cursor.fetchall()
     return rows
 
 def filter_internships(category):
-    connection = sqlite3.connect("internships.db")
-    cursor = connection.cursor()
+    with pool.connection(DB_NAME) as connection:
+        cursor = connection.cursor()
 
-    cursor.execute("SELECT * FROM internships WHERE category = ?", (category,))
-    rows = cursor.fetchall()
+        cursor.execute(f"SELECT {SELECT_COLUMNS} FROM internships WHERE category = ? AND deletedAt IS NULL", (category,))
+        rows = cursor.fetchall()
 
-    connection.close()
     return rows
 
 if __name__ == '__main__':
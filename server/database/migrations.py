@@ -0,0 +1,287 @@
+import sqlite3
+import logging
+from database import pool
+import database.internships as internships_module
+import database.recommendations as recommendations_module
+import database.trackers as trackers_module
+
+logger = logging.getLogger(__name__)
+
+'''
+Versioned schema migrations for every database file.
+
+Each database keeps a schema_migrations table listing the versions already
+applied, so startup only runs what is new. A migration is either a list of
+SQL statements or a function taking a cursor; it runs in one transaction
+together with the row that records it. Never edit a migration once shipped,
+append a new version instead.
+'''
+
+
+def _users_base(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users(
+            username TEXT PRIMARY KEY,
+            password TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            school TEXT,
+            email_personal TEXT,
+            email_school TEXT,
+            age INTEGER,
+            grade INTEGER,
+            extracurriculars TEXT,
+            interests TEXT,
+            gpa REAL,
+            courses TEXT,
+            auth_token TEXT UNIQUE
+        )
+    """)
+    # Older users.db files predate the profile columns
+    cursor.execute("PRAGMA table_info(users)")
+    cols = [r[1] for r in cursor.fetchall()]
+    required = {
+        'auth_token': "TEXT",
+        'extracurriculars': "TEXT",
+        'interests': "TEXT",
+        'gpa': "REAL",
+        'courses': "TEXT"
+    }
+    for col, col_type in required.items():
+        if col not in cols:
+            cursor.execute(f"ALTER TABLE users ADD COLUMN {col} {col_type}")
+            logger.info(f'Added {col} column to users table')
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS admins(
+            id TEXT PRIMARY KEY,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            school_name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            auth_token TEXT UNIQUE,
+            createdAt TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _users_principals(cursor):
+    # token -> (role, principal id) for both account tables, kept in sync by
+    # triggers so get_user_by_token/get_admin_by_token need one indexed lookup
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS principals(
+            token TEXT PRIMARY KEY,
+            role TEXT NOT NULL CHECK (role IN ('student', 'admin')),
+            principal_id TEXT NOT NULL
+        ) WITHOUT ROWID
+    """)
+    for table, role, key in (("users", "student", "username"), ("admins", "admin", "id")):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_principal_insert AFTER INSERT ON {table}
+            WHEN NEW.auth_token IS NOT NULL
+            BEGIN
+                INSERT INTO principals (token, role, principal_id) VALUES (NEW.auth_token, '{role}', NEW.{key});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_principal_update AFTER UPDATE OF auth_token, {key} ON {table}
+            BEGIN
+                DELETE FROM principals WHERE token = OLD.auth_token AND role = '{role}';
+                INSERT INTO principals (token, role, principal_id)
+                SELECT NEW.auth_token, '{role}', NEW.{key} WHERE NEW.auth_token IS NOT NULL;
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_principal_delete AFTER DELETE ON {table}
+            BEGIN
+                DELETE FROM principals WHERE token = OLD.auth_token AND role = '{role}';
+            END
+        """)
+    # Students first: get_user_by_token used to check users before admins
+    cursor.execute("""
+        INSERT OR IGNORE INTO principals (token, role, principal_id)
+        SELECT auth_token, 'student', username FROM users WHERE auth_token IS NOT NULL
+    """)
+    cursor.execute("""
+        INSERT OR IGNORE INTO principals (token, role, principal_id)
+        SELECT auth_token, 'admin', id FROM admins WHERE auth_token IS NOT NULL
+    """)
+
+
+def _internships_search_index(cursor):
+    internships_module.create_search_index(cursor, rebuild=True)
+
+
+def _internships_content_keys(cursor):
+    cursor.execute("ALTER TABLE internships ADD COLUMN contentKey TEXT")
+    cursor.execute("ALTER TABLE internships ADD COLUMN contentHash TEXT")
+    cursor.execute("ALTER TABLE internships ADD COLUMN deletedAt TEXT")
+    # Key the rows loaded from the catalogue CSV. Earlier full reloads left
+    # duplicates behind: the oldest copy keeps the key, the rest are retired.
+    cursor.execute("""
+        SELECT rowid, organization, name, Url FROM internships
+        WHERE creatorId = 'system' ORDER BY createdAt, rowid
+    """)
+    keyed = {}
+    duplicates = []
+    for rowid, organization, name, url in cursor.fetchall():
+        key = internships_module.content_key(organization, name, url)
+        if key in keyed:
+            duplicates.append((rowid,))
+        else:
+            keyed[key] = rowid
+    cursor.executemany("UPDATE internships SET contentKey = ? WHERE rowid = ?",
+                       [(key, rowid) for key, rowid in keyed.items()])
+    cursor.executemany("UPDATE internships SET deletedAt = CURRENT_TIMESTAMP WHERE rowid = ?", duplicates)
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_internships_content_key
+        ON internships(contentKey) WHERE contentKey IS NOT NULL
+    """)
+    if duplicates:
+        logger.info(f'Retired {len(duplicates)} duplicate catalogue rows')
+
+
+def _internships_content_hashes(cursor):
+    # v4 keyed the rows but left contentHash empty, so the first sync saw
+    # every program as changed. Hash the stored values (content_hash
+    # normalizes them); this also refreshes hashes written before that.
+    cursor.execute(f"""
+        SELECT rowid, {', '.join(internships_module.CONTENT_COLUMNS)} FROM internships
+        WHERE contentKey IS NOT NULL
+    """)
+    cursor.executemany("UPDATE internships SET contentHash = ? WHERE rowid = ?",
+                       [(internships_module.content_hash(row[1:]), row[0]) for row in cursor.fetchall()])
+
+
+def _trackers_unique(cursor):
+    # Keep the most recently updated copy of each duplicate
+    cursor.execute("""
+        DELETE FROM trackers WHERE rowid NOT IN (
+            SELECT rowid FROM (
+                SELECT rowid, ROW_NUMBER() OVER (
+                    PARTITION BY username, internshipId ORDER BY updatedAt DESC, rowid DESC
+                ) AS n FROM trackers
+            ) WHERE n = 1
+        )
+    """)
+    if cursor.rowcount:
+        logger.info(f'Removed {cursor.rowcount} duplicate trackers')
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_trackers_user_internship ON trackers(username, internshipId)")
+
+
+USERS_MIGRATIONS = [
+    (1, "users and admins tables", _users_base),
+    (2, "auth token lookup index", [
+        # admins.auth_token is already UNIQUE; users.auth_token was added by ALTER TABLE
+        "CREATE INDEX IF NOT EXISTS idx_users_auth_token ON users(auth_token)",
+    ]),
+    (3, "profile version for ETags", [
+        "ALTER TABLE users ADD COLUMN profile_version INTEGER NOT NULL DEFAULT 1",
+    ]),
+    (4, "unified token -> principal table", _users_principals),
+    (5, "session revocation list", [
+        "CREATE TABLE IF NOT EXISTS revoked_sessions(jti TEXT PRIMARY KEY, expiresAt INTEGER NOT NULL) WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS idx_revoked_sessions_expires ON revoked_sessions(expiresAt)",
+    ]),
+]
+
+INTERNSHIPS_MIGRATIONS = [
+    (1, "internships table", [internships_module.INTERNSHIPS_DDL]),
+    (2, "listing and filter indexes", [
+        "CREATE INDEX IF NOT EXISTS idx_internships_created ON internships(createdAt, id)",
+        "CREATE INDEX IF NOT EXISTS idx_internships_category_created ON internships(category, createdAt, id)",
+        "CREATE INDEX IF NOT EXISTS idx_internships_category_deadline ON internships(category, deadline)",
+    ]),
+    (3, "full-text search index", _internships_search_index),
+    (4, "catalogue content keys and soft delete", _internships_content_keys),
+    (5, "catalogue version counter", [
+        "CREATE TABLE IF NOT EXISTS catalogue_meta(key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+        "INSERT OR IGNORE INTO catalogue_meta (key, value) VALUES ('version', 1)",
+    ]),
+    (6, "content hashes for keyed catalogue rows", _internships_content_hashes),
+]
+
+TRACKERS_MIGRATIONS = [
+    (1, "trackers table", [trackers_module.TRACKERS_DDL]),
+    (2, "per-user tracker index", [
+        "CREATE INDEX IF NOT EXISTS idx_trackers_username_updated ON trackers(username, updatedAt)",
+    ]),
+    (3, "one tracker per user and internship", _trackers_unique),
+]
+
+RECOMMENDATIONS_MIGRATIONS = [
+    (1, "recommendation cache", [
+        """
+        CREATE TABLE IF NOT EXISTS recommendation_cache(
+            username TEXT PRIMARY KEY,
+            profileHash TEXT NOT NULL,
+            catalogueVersion INTEGER NOT NULL,
+            payload TEXT NOT NULL,
+            createdAt TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+]
+
+MIGRATIONS = {
+    'users.db': USERS_MIGRATIONS,
+    internships_module.DB_NAME: INTERNSHIPS_MIGRATIONS,
+    trackers_module.DB_NAME: TRACKERS_MIGRATIONS,
+    recommendations_module.DB_NAME: RECOMMENDATIONS_MIGRATIONS,
+}
+
+
+def applied_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations(
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            appliedAt TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {r[0] for r in cursor.fetchall()}
+
+
+def migrate(db_name, migrations):
+    """Apply any pending migrations to one database. Returns the versions applied."""
+    applied = []
+    with pool.connection(db_name) as connection:
+        cursor = connection.cursor()
+        done = applied_versions(cursor)
+        connection.commit()
+        for version, name, steps in sorted(migrations, key=lambda m: m[0]):
+            if version in done:
+                continue
+            try:
+                # IMMEDIATE takes the write lock up front; another process
+                # starting at the same time may have applied it meanwhile
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute("SELECT 1 FROM schema_migrations WHERE version = ?", (version,))
+                if cursor.fetchone():
+                    connection.rollback()
+                    continue
+                if callable(steps):
+                    steps(cursor)
+                else:
+                    for statement in steps:
+                        cursor.execute(statement)
+                cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (?, ?)", (version, name))
+                connection.commit()
+            except sqlite3.Error:
+                connection.rollback()
+                logger.exception(f'Migration {db_name} v{version} ({name}) failed')
+                raise
+            logger.info(f'Applied migration {db_name} v{version}: {name}')
+            applied.append(version)
+    return applied
+
+
+def run_migrations():
+    """Bring every database up to the latest schema version."""
+    for db_name, migrations in MIGRATIONS.items():
+        migrate(db_name, migrations)
+
+
+if __name__ == '__main__':
+    run_migrations()
@@ -0,0 +1,238 @@
+import sqlite3
+import threading
+import queue
+import os
+import time
+import logging
+import functools
+from contextlib import contextmanager
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of open connections per database file
+POOL_SIZE = int(os.environ.get("INTERNNET_DB_POOL_SIZE", "8"))
+
+# How long a checkout waits for a free connection before giving up (seconds)
+CHECKOUT_TIMEOUT = float(os.environ.get("INTERNNET_DB_CHECKOUT_TIMEOUT", "10"))
+
+# Prepared statements kept per connection (sqlite3 default is 128)
+STATEMENT_CACHE_SIZE = 256
+
+# Applied once, when a connection is first opened
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+    "PRAGMA mmap_size=67108864",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA foreign_keys=ON",
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def _statement_kind(sql):
+    """SELECT/INSERT/UPDATE/... for the query timing label (SQL strings are mostly constants)."""
+    words = sql.split(None, 1)
+    kind = words[0].upper() if words else ""
+    return kind if kind in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "BEGIN", "CREATE", "PRAGMA") else "OTHER"
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that records every execute() in metrics.DB_QUERY_LATENCY."""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.connection.query_histogram(sql).observe(time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self.connection.query_histogram(sql).observe(time.perf_counter() - start)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors (including connection.execute shortcuts) are TimedCursors."""
+
+    db_label = ""
+
+    def query_histogram(self, sql):
+        # Cached per SQL string so the hot path skips building label keys
+        try:
+            return self._histograms[sql]
+        except AttributeError:
+            self._histograms = {}
+        except KeyError:
+            pass
+        histogram = metrics.DB_QUERY_LATENCY.labels(db=self.db_label, statement=_statement_kind(sql))
+        if len(self._histograms) < STATEMENT_CACHE_SIZE:
+            self._histograms[sql] = histogram
+        return histogram
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of sqlite3 connections for a single database file.
+    Connections are opened lazily up to `size` and handed back on release.
+    """
+
+    def __init__(self, db_name, size=POOL_SIZE):
+        self.db_name = db_name
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+        self.checkouts = 0
+        self.waits = 0
+
+    def _open(self):
+        connection = sqlite3.connect(
+            self.db_name,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            factory=TimedConnection,
+        )
+        connection.db_label = os.path.basename(self.db_name)
+        cursor = connection.cursor()
+        for pragma in PRAGMAS:
+            try:
+                cursor.execute(pragma)
+            except sqlite3.Error:
+                logger.warning(f"Could not apply '{pragma}' on {self.db_name}")
+        cursor.close()
+        logger.debug(f"Opened pooled connection to {self.db_name}")
+        return connection
+
+    def acquire(self):
+        """Check out a connection, opening a new one if the pool is not full."""
+        if self._closed:
+            raise RuntimeError(f"Connection pool for {self.db_name} is closed")
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = None
+            with self._lock:
+                if self._opened < self.size:
+                    self._opened += 1
+                    opening = True
+                else:
+                    self.waits += 1
+                    opening = False
+            if opening:
+                try:
+                    connection = self._open()
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            else:
+                try:
+                    connection = self._idle.get(timeout=CHECKOUT_TIMEOUT)
+                except queue.Empty:
+                    raise TimeoutError(f"Timed out waiting for a connection to {self.db_name}")
+        with self._lock:
+            self.checkouts += 1
+        return connection
+
+    def release(self, connection):
+        """Return a connection to the pool, rolling back any open transaction."""
+        if connection.in_transaction:
+            connection.rollback()
+        if self._closed:
+            connection.close()
+            with self._lock:
+                self._opened -= 1
+            return
+        self._idle.put(connection)
+
+    def close(self):
+        """Close all idle connections; connections in use are closed on release."""
+        self._closed = True
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            connection.close()
+            with self._lock:
+                self._opened -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "db": self.db_name,
+                "size": self._opened,
+                "max_size": self.size,
+                "idle": self._idle.qsize(),
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_name):
+    """Return the shared pool for a database file, creating it on first use."""
+    key = os.path.abspath(db_name)
+    pool = _pools.get(key)
+    if pool is None or pool._closed:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None or pool._closed:
+                pool = ConnectionPool(db_name)
+                _pools[key] = pool
+    return pool
+
+
+@contextmanager
+def connection(db_name):
+    """
+    Borrow a pooled connection. Commits on a clean exit and rolls back if
+    the block raises.
+    """
+    pool = get_pool(db_name)
+    conn = pool.acquire()
+    try:
+        yield conn
+        if conn.in_transaction:
+            conn.commit()
+    except BaseException:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        pool.release(conn)
+
+
+def pool_stats():
+    """Stats for every pool opened by this process."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools]
+
+
+def close_all():
+    """Drain and close every pool (used on shutdown and before forking)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,51 @@
+import json
+import hashlib
+import logging
+import sqlite3
+from database import pool
+
+logger = logging.getLogger(__name__)
+
+# Persistent cache of AI recommendation results, one entry per student
+DB_NAME = "recommendations.db"
+
+
+def profile_hash(student_bio):
+    return hashlib.sha256(student_bio.encode("utf-8")).hexdigest()
+
+
+def get_cached(username, bio_hash, catalogue_version):
+    """
+    Return the cached recommendation payload for `username` if it was built
+    from the same profile bio and catalogue version, else None.
+    """
+    try:
+        with pool.connection(DB_NAME) as connection:
+            row = connection.execute("""
+                SELECT payload FROM recommendation_cache
+                WHERE username = ? AND profileHash = ? AND catalogueVersion = ?
+            """, (username, bio_hash, catalogue_version)).fetchone()
+        return json.loads(row[0]) if row else None
+    except (sqlite3.Error, ValueError) as e:
+        logger.error(f"Error reading recommendation cache for '{username}': {str(e)}", exc_info=True)
+        return None
+
+
+def store(username, bio_hash, catalogue_version, payload):
+    """Cache a payload, replacing whatever was stored for this student."""
+    try:
+        with pool.connection(DB_NAME) as connection:
+            connection.execute("""
+                INSERT OR REPLACE INTO recommendation_cache (username, profileHash, catalogueVersion, payload)
+                VALUES (?, ?, ?, ?)
+            """, (username, bio_hash, catalogue_version, json.dumps(payload)))
+    except sqlite3.Error as e:
+        logger.error(f"Error writing recommendation cache for '{username}': {str(e)}", exc_info=True)
+
+
+def invalidate(username):
+    try:
+        with pool.connection(DB_NAME) as connection:
+            connection.execute("DELETE FROM recommendation_cache WHERE username = ?", (username,))
+    except sqlite3.Error as e:
+        logger.error(f"Error invalidating recommendation cache for '{username}': {str(e)}", exc_info=True)
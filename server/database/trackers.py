@@ -0,0 +1,128 @@
+import uuid
+import logging
+from database import pool
+
+logger = logging.getLogger(__name__)
+
+'''
+Tracker storage. The schema is created and upgraded by database.migrations
+at startup, so nothing here runs DDL. (username, internshipId) is unique:
+tracking an internship twice returns the existing tracker.
+'''
+
+# Internships each student is tracking, with their application status
+DB_NAME = "trackers.db"
+
+# Columns returned to the owner of a tracker, in the order reads return them
+COLUMNS = ("id", "internshipId", "status", "notes", "updatedAt")
+SELECT_COLUMNS = ", ".join(COLUMNS)
+
+DEFAULT_STATUS = "interested"
+
+TRACKERS_DDL = """
+    CREATE TABLE IF NOT EXISTS trackers(
+        id TEXT PRIMARY KEY,
+        username TEXT NOT NULL,
+        internshipId TEXT NOT NULL,
+        status TEXT NOT NULL,
+        notes TEXT,
+        updatedAt TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def list_trackers(username):
+    """All trackers of a user as rows in COLUMNS order, oldest change first."""
+    with pool.connection(DB_NAME) as connection:
+        rows = connection.execute(
+            f"SELECT {SELECT_COLUMNS} FROM trackers WHERE username = ? ORDER BY updatedAt, id", (username,)
+        ).fetchall()
+    return rows
+
+
+def _create(cursor, username, internship_id, status=None, notes=None):
+    tracker_id = str(uuid.uuid4())
+    cursor.execute("""
+        INSERT INTO trackers (id, username, internshipId, status, notes) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(username, internshipId) DO NOTHING
+    """, (tracker_id, username, internship_id, status or DEFAULT_STATUS, notes or ''))
+    if cursor.rowcount:
+        return tracker_id, True
+    cursor.execute("SELECT id FROM trackers WHERE username = ? AND internshipId = ?", (username, internship_id))
+    return cursor.fetchone()[0], False
+
+
+def _update(cursor, username, tracker_id, status=None, notes=None):
+    # The username check makes ownership part of the same statement
+    cursor.execute("""
+        UPDATE trackers SET status = COALESCE(?, status), notes = COALESCE(?, notes), updatedAt = CURRENT_TIMESTAMP
+        WHERE id = ? AND username = ?
+    """, (status, notes, tracker_id, username))
+    return cursor.rowcount > 0
+
+
+def _delete(cursor, username, tracker_id):
+    cursor.execute("DELETE FROM trackers WHERE id = ? AND username = ?", (tracker_id, username))
+    return cursor.rowcount > 0
+
+
+def create_tracker(username, internship_id, status=None, notes=None):
+    """
+    Track an internship for a user. Returns (tracker_id, created); created is
+    False when the user already tracks it, in which case nothing changes.
+    """
+    with pool.connection(DB_NAME) as connection:
+        return _create(connection.cursor(), username, internship_id, status, notes)
+
+
+def update_tracker(username, tracker_id, status=None, notes=None):
+    """Change status and/or notes. Returns False if the tracker isn't the user's."""
+    with pool.connection(DB_NAME) as connection:
+        return _update(connection.cursor(), username, tracker_id, status, notes)
+
+
+def delete_tracker(username, tracker_id):
+    """Returns False if the tracker isn't the user's."""
+    with pool.connection(DB_NAME) as connection:
+        return _delete(connection.cursor(), username, tracker_id)
+
+
+def apply_operations(username, operations):
+    """
+    Apply validated create/update/delete operations in one transaction.
+    Ownership of every referenced tracker is checked with a single query
+    first; if any is missing or someone else's (or an update/delete finds
+    nothing to change), nothing is applied and None is returned. Otherwise
+    returns [{"op": ..., "id": ...}, ...].
+    """
+    with pool.connection(DB_NAME) as connection:
+        cursor = connection.cursor()
+        # Take the write lock before the ownership check, so no other
+        # request can delete a tracker between the check and the writes
+        cursor.execute("BEGIN IMMEDIATE")
+
+        ids = list({op['id'] for op in operations if op['op'] != 'create'})
+        if ids:
+            placeholders = ", ".join("?" * len(ids))
+            cursor.execute(f"SELECT COUNT(*) FROM trackers WHERE username = ? AND id IN ({placeholders})", [username] + ids)
+            if cursor.fetchone()[0] != len(ids):
+                connection.rollback()
+                return None
+
+        results = []
+        for op in operations:
+            if op['op'] == 'create':
+                tracker_id, _ = _create(cursor, username, op['internshipId'], op.get('status'), op.get('notes'))
+                applied = True
+            elif op['op'] == 'update':
+                tracker_id = op['id']
+                applied = _update(cursor, username, tracker_id, op.get('status'), op.get('notes'))
+            else:
+                tracker_id = op['id']
+                applied = _delete(cursor, username, tracker_id)
+            if not applied:
+                # e.g. an update after a delete of the same tracker in this batch
+                connection.rollback()
+                return None
+            results.append({"op": op['op'], "id": tracker_id})
+        return results
@@ -0,0 +1,55 @@
+import os
+import multiprocessing
+
+'''
+gunicorn settings for the InternNet API:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every value can be overridden with the INTERNNET_* variables below.
+'''
+
+bind = f"{os.environ.get('INTERNNET_HOST', '127.0.0.1')}:{os.environ.get('INTERNNET_PORT', '5000')}"
+
+# SQLite has one writer per file, so a few processes with threads beat many processes
+workers = int(os.environ.get("INTERNNET_WORKERS", min(2 * multiprocessing.cpu_count(), 8)))
+threads = int(os.environ.get("INTERNNET_THREADS", "8"))
+worker_class = "gthread"
+
+# Import wsgi (and run the migrations) once in the master, then fork
+preload_app = True
+
+# Recommendation requests wait on the LLM, give them time
+timeout = int(os.environ.get("INTERNNET_WORKER_TIMEOUT", "60"))
+graceful_timeout = int(os.environ.get("INTERNNET_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# Access lines go through logging_setup (queued, sampled) rather than a
+# stdout handler that writes on the worker thread
+accesslog = "-"
+
+
+def _queued_access_logger():
+    from gunicorn.glogging import Logger
+
+    class QueuedAccessLogger(Logger):
+        def setup(self, cfg):
+            super().setup(cfg)
+            import logging_setup
+            logging_setup.route_access_log(self.access_log)
+
+    return QueuedAccessLogger
+
+
+logger_class = _queued_access_logger()
+
+
+def pre_fork(server, worker):
+    # Children must not share the master's SQLite connections
+    from database import pool
+    pool.close_all()
+
+
+def worker_exit(server, worker):
+    import main
+    main.shutdown()
@@ -1,6 +1,11 @@
 import sqlite3
 import pandas as pd
 import uuid
+import time
+import argparse
+from database import pool
+import database.internships as internships_module
+from database import migrations
 
 # Database filename constant
 DB_NAME = "internships.db"
@@ -66,6 +71,178 @@ def initiate():
     connection.commit()
     connection.close()
 
+# Columns written by bulk_ingest and sync_catalogue, in INSERT order
+INGEST_COLUMNS = ["id", "name", "organization", "Url", "contact", "deadline",
+                  "category", "location", "description", "creatorId",
+                  "contentKey", "contentHash"]
+
+INGEST_CREATOR = "system"
+MISSING = "N/A"
+
+def _text_column(df, column, default=MISSING):
+    """Stripped text column with blanks/NaN replaced by `default` (vectorized)."""
+    if column not in df.columns:
+        return pd.Series(default, index=df.index, dtype=object)
+    values = df[column].astype("string").fillna("").str.strip()
+    return values.astype(object).where(values != "", default)
+
+def map_catalogue_frame(df):
+    """
+    Map a fixed_jobs_data.csv frame onto the internships table columns using
+    whole-column operations. Rows without a program name are dropped.
+    """
+    name = _text_column(df, "Program Name", "")
+    keep = name != ""
+    df = df[keep]
+    name = name[keep]
+
+    organization = _text_column(df, "Institution Name")
+    description = _text_column(df, "Description", "")
+    fallback = name.where(organization == MISSING, name + " - " + organization)
+    description = description.where(description != "", fallback)
+
+    mapped = pd.DataFrame({
+        "id": [str(uuid.uuid4()) for _ in range(len(df))],
+        "name": name,
+        "organization": organization,
+        "Url": _text_column(df, "Website Address", None),
+        "contact": MISSING,
+        "deadline": _text_column(df, "Deadline"),
+        "category": _text_column(df, "AI_Category"),
+        "location": _text_column(df, "Geographic Location"),
+        "description": description,
+        "creatorId": INGEST_CREATOR,
+    }, index=df.index)
+    mapped["contentKey"] = [
+        internships_module.content_key(*values)
+        for values in zip(mapped["organization"], mapped["name"], mapped["Url"])
+    ]
+    mapped["contentHash"] = [
+        internships_module.content_hash(values)
+        for values in zip(*(mapped[c] for c in internships_module.CONTENT_COLUMNS))
+    ]
+    return mapped[INGEST_COLUMNS]
+
+def _iter_frames(source, chunksize):
+    """Accept a CSV path, a DataFrame, or an iterable of DataFrames (e.g. read_csv(chunksize=...))."""
+    if isinstance(source, pd.DataFrame):
+        yield source
+    elif isinstance(source, str):
+        yield from pd.read_csv(source, chunksize=chunksize)
+    else:
+        yield from source
+
+def bulk_ingest(source="fixed_jobs_data.csv", chunksize=50000, batch_size=5000):
+    """
+    Load the catalogue CSV into the internships table. The CSV is read in
+    chunks so memory stays flat, each chunk is mapped with vectorized pandas
+    operations, and rows are written with executemany, one transaction per
+    batch. Programs already present (same content key) are skipped.
+    Returns {"rows", "inserted", "seconds", "rows_per_second"}.
+    """
+    migrations.migrate(DB_NAME, migrations.INTERNSHIPS_MIGRATIONS)
+    # Programs already in the table (same content key) are skipped, so a
+    # repeated load does not duplicate the catalogue
+    insert_sql = f"""
+        INSERT INTO internships ({', '.join(INGEST_COLUMNS)}) VALUES ({', '.join('?' * len(INGEST_COLUMNS))})
+        ON CONFLICT(contentKey) WHERE contentKey IS NOT NULL DO NOTHING
+    """
+
+    start = time.perf_counter()
+    total = 0
+    inserted = 0
+    for frame in _iter_frames(source, chunksize):
+        mapped = map_catalogue_frame(frame)
+        rows = list(mapped.itertuples(index=False, name=None))
+        for offset in range(0, len(rows), batch_size):
+            batch = rows[offset:offset + batch_size]
+            with pool.connection(DB_NAME) as connection:
+                cursor = connection.cursor()
+                added = cursor.executemany(insert_sql, batch).rowcount
+                if added:
+                    internships_module.bump_catalogue_version(cursor)
+            inserted += added
+            total += len(batch)
+
+    seconds = time.perf_counter() - start
+    rate = total / seconds if seconds else float("inf")
+    print(f"Ingested {total} rows ({inserted} new) in {seconds:.2f}s ({rate:,.0f} rows/s).")
+    return {"rows": total, "inserted": inserted, "seconds": seconds, "rows_per_second": rate}
+
+def sync_catalogue(source="fixed_jobs_data.csv", chunksize=50000, batch_size=5000):
+    """
+    Incrementally bring the table in line with the catalogue CSV. Programs are
+    matched on their content key (institution, program name, URL): new ones are
+    inserted, changed ones updated in place (keeping their id), and ones that
+    disappeared from the CSV are soft-deleted (deletedAt). Unchanged rows are
+    not written. Runs as a single transaction.
+    Returns counts of inserted/updated/unchanged/deleted rows.
+    """
+    migrations.migrate(DB_NAME, migrations.INTERNSHIPS_MIGRATIONS)
+    insert_sql = f"INSERT INTO internships ({', '.join(INGEST_COLUMNS)}) VALUES ({', '.join('?' * len(INGEST_COLUMNS))})"
+    update_sql = f"""
+        UPDATE internships
+        SET {', '.join(f'{c} = ?' for c in internships_module.CONTENT_COLUMNS)},
+            contentHash = ?, deletedAt = NULL, updatedAt = CURRENT_TIMESTAMP
+        WHERE contentKey = ?
+    """
+    delete_sql = """
+        UPDATE internships SET deletedAt = CURRENT_TIMESTAMP, updatedAt = CURRENT_TIMESTAMP
+        WHERE contentKey = ? AND deletedAt IS NULL
+    """
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0}
+
+    start = time.perf_counter()
+    with pool.connection(DB_NAME) as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT contentKey, contentHash, deletedAt FROM internships WHERE contentKey IS NOT NULL")
+        current = {key: (digest, deleted_at) for key, digest, deleted_at in cursor.fetchall()}
+
+        seen = set()
+        inserts, updates = [], []
+        for frame in _iter_frames(source, chunksize):
+            mapped = map_catalogue_frame(frame)
+            for row in mapped.itertuples(index=False, name=None):
+                record = dict(zip(INGEST_COLUMNS, row))
+                key = record["contentKey"]
+                if key in seen:
+                    continue
+                seen.add(key)
+                existing = current.get(key)
+                if existing is None:
+                    inserts.append(row)
+                elif existing[0] != record["contentHash"] or existing[1] is not None:
+                    updates.append(tuple(record[c] for c in internships_module.CONTENT_COLUMNS)
+                                   + (record["contentHash"], key))
+                else:
+                    counts["unchanged"] += 1
+
+                if len(inserts) >= batch_size:
+                    cursor.executemany(insert_sql, inserts)
+                    counts["inserted"] += len(inserts)
+                    inserts = []
+                if len(updates) >= batch_size:
+                    cursor.executemany(update_sql, updates)
+                    counts["updated"] += len(updates)
+                    updates = []
+
+        cursor.executemany(insert_sql, inserts)
+        counts["inserted"] += len(inserts)
+        cursor.executemany(update_sql, updates)
+        counts["updated"] += len(updates)
+
+        gone = [(key,) for key, (_, deleted_at) in current.items() if key not in seen and deleted_at is None]
+        cursor.executemany(delete_sql, gone)
+        counts["deleted"] = len(gone)
+
+        if counts["inserted"] or counts["updated"] or counts["deleted"]:
+            internships_module.bump_catalogue_version(cursor)
+
+    seconds = time.perf_counter() - start
+    print(f"Synced catalogue in {seconds:.2f}s: {counts['inserted']} inserted, {counts['updated']} updated, "
+          f"{counts['unchanged']} unchanged, {counts['deleted']} deleted.")
+    return counts
+
 def add_internship(data):
     """
     Adds a single internship from a dictionary.
@@ -133,4 +310,16 @@ def filter_internships(category):
 
 if __name__ == '__main__':
     # This block runs only when you execute the file directly
-    initiate()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Load fixed_jobs_data.csv into internships.db")
+    parser.add_argument("--bulk", action="store_true", help="chunked, batched ingest into the app's internships schema")
+    parser.add_argument("--sync", action="store_true", help="incremental upsert/soft-delete against the current table")
+    parser.add_argument("--csv", default="fixed_jobs_data.csv")
+    parser.add_argument("--chunksize", type=int, default=50000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+    if args.sync:
+        sync_catalogue(args.csv, chunksize=args.chunksize, batch_size=args.batch_size)
+    elif args.bulk:
+        bulk_ingest(args.csv, chunksize=args.chunksize, batch_size=args.batch_size)
+    else:
+        initiate()
\ No newline at end of file
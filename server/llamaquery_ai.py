@@ -1,9 +1,12 @@
 import pandas as pd
-from groq import Groq
 import json
 import os
-import sqlite3
-GROQ_API_KEY = "api key here"
+import asyncio
+from database import pool
+import database.internships as internships_module
+import database.recommendations as recommendations_cache
+import retrieval
+import llm_backends
 
 INTERNSHIPS_AVALIABLE_CSV = r"/server/internships.db"
 
@@ -14,8 +17,7 @@ STUDENT_PROFILE = r"/server/authentication.py"
 OUTPUT_FILE = r"/server/final_reccomendation"
 # =================================================
 
-# Initialize Client
-client = Groq(api_key=GROQ_API_KEY)
+# LLM calls go through llm_backends (Groq or the local stand-in)
 
 
 def build_student_bio(user_data):
@@ -40,7 +42,7 @@ def build_student_bio(user_data):
     
     return " | ".join(bio_parts) if bio_parts else "Student seeking internship opportunities"
 
-def get_student_categories(student_bio):
+def get_student_categories(student_bio, categories=None):
     """
     Step 1: Analyze Student Bio to get their Interest Categories.
     """
@@ -51,30 +53,32 @@ def get_student_categories(student_bio):
     """
     
     try:
-        completion = client.chat.completions.create(
+        result = llm_backends.complete_json(
+            "categories",
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": student_bio}
             ],
-            model="llama-3.3-70b-versatile",
-            response_format={"type": "json_object"}
+            context={"student_bio": student_bio, "categories": categories}
         )
-        return json.loads(completion.choices[0].message.content)['categories']
+        return result['categories']
     except Exception as e:
         print(f"Error categorizing student: {e}")
         return ["STEM"] # Fallback
 
-def rank_jobs_with_ai(student_bio, candidate_jobs):
+def build_rank_request(student_bio, candidate_jobs):
     """
-    Step 2: Send the filtered jobs to AI and ask for the Top 5 matches + Reasoning.
+    Messages and backend context asking for the Top 5 matches + Reasoning.
     """
     # Convert the dataframe to a simple text list to save tokens
     # We pass the index so we can look it up later
     jobs_text = ""
+    jobs = []
     for index, row in candidate_jobs.iterrows():
         # Truncate description to 200 chars to fit more jobs in context
         desc = str(row.get('description', ''))[:200]
         jobs_text += f"ID: {index} | Name: {row.get('name', 'N/A')} | Desc: {desc}...\n"
+        jobs.append((index, f"{row.get('name', '')} {desc}"))
 
     system_prompt = f"""
     You are a helpful internship matchmaker. 
@@ -94,30 +98,45 @@ def rank_jobs_with_ai(student_bio, candidate_jobs):
     }}
     """
 
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": jobs_text}
+    ]
+    return messages, {"student_bio": student_bio, "jobs": jobs}
+
+def rank_jobs_with_ai(student_bio, candidate_jobs):
+    """
+    Step 2: Send the filtered jobs to AI and ask for the Top 5 matches + Reasoning.
+    """
+    messages, context = build_rank_request(student_bio, candidate_jobs)
     try:
-        completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": jobs_text}
-            ],
-            model="llama-3.3-70b-versatile", 
-            response_format={"type": "json_object"}
-        )
-        return json.loads(completion.choices[0].message.content)['matches']
+        result = llm_backends.complete_json("rank", messages=messages, context=context)
+        return result['matches']
     except Exception as e:
         print(f"Error ranking jobs: {e}")
         return []
 
+async def rank_jobs_with_ai_async(student_bio, candidate_jobs):
+    """rank_jobs_with_ai() without blocking the event loop on the LLM call."""
+    messages, context = build_rank_request(student_bio, candidate_jobs)
+    try:
+        result = await llm_backends.complete_json_async("rank", messages=messages, context=context)
+        return result['matches']
+    except Exception as e:
+        print(f"Error ranking jobs: {e}")
+        return []
 
-def get_student_recommendations(username):
+
+def prepare_recommendations(username):
     """
-    Main API function to get internship recommendations for a student.
-    Fetches student profile from users DB, gets all internships, and ranks them.
-    Returns top 5 recommendations with AI reasoning.
+    Everything before the LLM call (DB and CPU work only). Returns either
+    {"result": ...}, a final answer (cached result or error), or the state
+    finish_recommendations() needs: user, bio, cache keys and candidates.
+    Results are cached per student, keyed by the profile bio and the catalogue
+    version, so repeat visits skip the catalogue load and the LLM call.
     """
-    try:
-        # 1. Get student profile from users database
-        conn = sqlite3.connect('users.db')
+    # 1. Get student profile from users database
+    with pool.connection('users.db') as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT username, first_name, last_name, school, grade, gpa, 
@@ -125,86 +144,128 @@ def get_student_recommendations(username):
             FROM users WHERE username = ?
         """, (username,))
         user_row = cursor.fetchone()
-        conn.close()
-        
-        if not user_row:
-            return {"success": False, "error": "User not found"}
-        
-        # Build user dict
-        user_data = {
-            'username': user_row[0],
-            'first_name': user_row[1],
-            'last_name': user_row[2],
-            'school': user_row[3],
-            'grade': user_row[4],
-            'gpa': user_row[5],
-            'interests': user_row[6],
-            'extracurriculars': user_row[7],
-            'courses': user_row[8]
-        }
-        
-        # Build bio from student profile
-        student_bio = build_student_bio(user_data)
-        
-        # 2. Load all internships from internships database
-        conn = sqlite3.connect('internships.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM internships")
-        columns = [description[0] for description in cursor.description]
-        rows = cursor.fetchall()
-        conn.close()
-        
-        # Convert to dataframe for AI processing
-        df_jobs = pd.DataFrame(rows, columns=columns)
-        
-        if df_jobs.empty:
-            return {"success": False, "error": "No internships available"}
-        
-        # 3. Limit to top 100 internships to save tokens
-        candidates = df_jobs.head(100)
+    
+    if not user_row:
+        return {"result": {"success": False, "error": "User not found"}}
+    
+    # Build user dict
+    user_data = {
+        'username': user_row[0],
+        'first_name': user_row[1],
+        'last_name': user_row[2],
+        'school': user_row[3],
+        'grade': user_row[4],
+        'gpa': user_row[5],
+        'interests': user_row[6],
+        'extracurriculars': user_row[7],
+        'courses': user_row[8]
+    }
+    
+    # Build bio from student profile
+    student_bio = build_student_bio(user_data)
+
+    # Serve from cache when neither the profile nor the catalogue changed
+    bio_hash = recommendations_cache.profile_hash(student_bio)
+    catalogue_version = internships_module.get_catalogue_version()
+    cached = recommendations_cache.get_cached(username, bio_hash, catalogue_version)
+    if cached is not None:
+        return {"result": cached}
+    
+    # 2. Load the catalogue (kept in memory with its retrieval index until it changes)
+    df_jobs, index = retrieval.load_catalogue(catalogue_version)
+    
+    if df_jobs.empty:
+        return {"result": {"success": False, "error": "No internships available"}}
+    
+    # 3. Only the internships closest to the student's bio go to the LLM
+    candidates = retrieval.top_candidates(df_jobs, index, student_bio)
+    return {
+        "username": username,
+        "user_data": user_data,
+        "student_bio": student_bio,
+        "bio_hash": bio_hash,
+        "catalogue_version": catalogue_version,
+        "df_jobs": df_jobs,
+        "candidates": candidates
+    }
+
+def finish_recommendations(state, top_matches):
+    """Turn the LLM's matches into the API result and cache it."""
+    if not top_matches:
+        return {"success": False, "error": "Could not generate recommendations"}
+    
+    # 5. Build recommendation results with full job details
+    df_jobs, candidates = state["df_jobs"], state["candidates"]
+    recommendations = []
+    for match in top_matches:
+        try:
+            job_id = int(match['id'])
+            reason = match.get('reason', '')
+            
+            # Find the job in dataframe (only IDs we actually offered)
+            if job_id in candidates.index:
+                job = df_jobs.iloc[job_id].to_dict()
+                # Use the actual database ID (UUID) instead of row index
+                db_id = job.get('id', str(job_id))
+                recommendations.append({
+                    'id': db_id,
+                    'program_name': job.get('name', 'N/A'),
+                    'company': job.get('organization', 'N/A'),
+                    'location': job.get('location', 'N/A'),
+                    'description': job.get('description', 'N/A'),
+                    'url': job.get('Url', 'N/A'),
+                    'ai_reason': reason
+                })
+        except Exception as e:
+            print(f"Error processing match {match}: {e}")
+            continue
+    
+    result = {
+        "success": True,
+        "student": state["user_data"].get('first_name', 'Student'),
+        "bio_summary": state["student_bio"],
+        "recommendations": recommendations
+    }
+    recommendations_cache.store(state["username"], state["bio_hash"], state["catalogue_version"], result)
+    return result
+
+def get_student_recommendations(username):
+    """
+    Main API function to get internship recommendations for a student.
+    Fetches student profile from users DB, gets all internships, and ranks them.
+    Returns top 5 recommendations with AI reasoning.
+    """
+    try:
+        state = prepare_recommendations(username)
+        if "result" in state:
+            return state["result"]
         
         # 4. Get AI recommendations
-        top_matches = rank_jobs_with_ai(student_bio, candidates)
-        
-        if not top_matches:
-            return {"success": False, "error": "Could not generate recommendations"}
-        
-        # 5. Build recommendation results with full job details
-        recommendations = []
-        for match in top_matches:
-            try:
-                job_id = int(match['id'])
-                reason = match.get('reason', '')
-                
-                # Find the job in dataframe
-                if job_id < len(df_jobs):
-                    job = df_jobs.iloc[job_id].to_dict()
-                    # Use the actual database ID (UUID) instead of row index
-                    db_id = job.get('id', str(job_id))
-                    recommendations.append({
-                        'id': db_id,
-                        'program_name': job.get('name', 'N/A'),
-                        'company': job.get('organization', 'N/A'),
-                        'location': job.get('location', 'N/A'),
-                        'description': job.get('description', 'N/A'),
-                        'url': job.get('Url', 'N/A'),
-                        'ai_reason': reason
-                    })
-            except Exception as e:
-                print(f"Error processing match {match}: {e}")
-                continue
-        
-        return {
-            "success": True,
-            "student": user_data.get('first_name', 'Student'),
-            "bio_summary": student_bio,
-            "recommendations": recommendations
-        }
+        top_matches = rank_jobs_with_ai(state["student_bio"], state["candidates"])
+        return finish_recommendations(state, top_matches)
     
     except Exception as e:
         print(f"Error getting recommendations: {e}")
         return {"success": False, "error": str(e)}
 
+async def get_student_recommendations_async(username):
+    """
+    get_student_recommendations() for an asyncio server: DB and CPU steps run
+    in worker threads, and the LLM call awaits an async client, so the event
+    loop keeps serving other requests while the LLM works.
+    """
+    try:
+        state = await asyncio.to_thread(prepare_recommendations, username)
+        if "result" in state:
+            return state["result"]
+
+        top_matches = await rank_jobs_with_ai_async(state["student_bio"], state["candidates"])
+        return await asyncio.to_thread(finish_recommendations, state, top_matches)
+
+    except Exception as e:
+        print(f"Error getting recommendations: {e}")
+        return {"success": False, "error": str(e)}
+
 # ================= MAIN LOGIC =================
 # This section runs only when llamaquery_ai.py is executed directly, not when imported
 if __name__ == "__main__":
@@ -222,7 +283,8 @@ if __name__ == "__main__":
 
     # 2. Get Categories
     print("\nAnalyzing student interests...")
-    target_categories = get_student_categories(student_bio)
+    known_categories = df_jobs['AI_Category'].dropna().unique().tolist() if 'AI_Category' in df_jobs.columns else None
+    target_categories = get_student_categories(student_bio, known_categories)
     print(f"Target Categories: {target_categories}")
 
     # 3. Filter Database 
@@ -0,0 +1,239 @@
+import os
+import json
+import time
+import random
+import asyncio
+import weakref
+import threading
+import logging
+import metrics
+
+logger = logging.getLogger(__name__)
+
+'''
+LLM backends for the recommender.
+
+Every backend answers the same two tasks with the same JSON contract:
+    "categories" -> {"categories": ["Category1", ...]}
+    "rank"       -> {"matches": [{"id": 123, "reason": "..."}, ...]}
+
+complete_json() wraps whichever backend is active with a per-call timeout,
+retries with exponential backoff, and a latency histogram per backend/task.
+complete_json_async() does the same for asyncio callers, with at most
+INTERNNET_LLM_MAX_CONCURRENCY calls in flight per event loop.
+
+Select a backend with INTERNNET_LLM_BACKEND=groq|local. The default is groq
+when GROQ_API_KEY is set and local otherwise.
+'''
+
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
+GROQ_MODEL = os.environ.get("INTERNNET_GROQ_MODEL", "llama-3.3-70b-versatile")
+
+LLM_TIMEOUT = float(os.environ.get("INTERNNET_LLM_TIMEOUT", "20"))
+LLM_RETRIES = int(os.environ.get("INTERNNET_LLM_RETRIES", "2"))
+LLM_BACKOFF = float(os.environ.get("INTERNNET_LLM_BACKOFF", "0.5"))
+# In-flight LLM calls allowed at once on the async path
+LLM_MAX_CONCURRENCY = int(os.environ.get("INTERNNET_LLM_MAX_CONCURRENCY", "8"))
+
+# Matches returned by the local backend (the prompt asks the LLM for 5)
+LOCAL_TOP_N = 5
+
+
+class LLMBackend:
+    """Base class: complete() returns the raw JSON text for a task."""
+
+    name = "base"
+
+    def complete(self, task, messages, context, timeout):
+        raise NotImplementedError
+
+    async def complete_async(self, task, messages, context, timeout):
+        """Async complete(); backends without an async client run it in a thread."""
+        return await asyncio.to_thread(self.complete, task, messages, context, timeout)
+
+
+class GroqBackend(LLMBackend):
+    """Chat completions against Groq's hosted Llama model."""
+
+    name = "groq"
+
+    def __init__(self, api_key=None, model=GROQ_MODEL):
+        from groq import Groq, AsyncGroq
+        # Retries are handled by complete_json so every backend behaves the same
+        self.client = Groq(api_key=api_key or GROQ_API_KEY, max_retries=0)
+        self.async_client = AsyncGroq(api_key=api_key or GROQ_API_KEY, max_retries=0)
+        self.model = model
+
+    def complete(self, task, messages, context, timeout):
+        completion = self.client.chat.completions.create(
+            messages=messages,
+            model=self.model,
+            response_format={"type": "json_object"},
+            timeout=timeout
+        )
+        self._record_usage(completion)
+        return completion.choices[0].message.content
+
+    def _record_usage(self, completion):
+        usage = getattr(completion, "usage", None)
+        if usage is not None:
+            metrics.LLM_TOKENS.inc(usage.prompt_tokens or 0, backend=self.name, kind="prompt")
+            metrics.LLM_TOKENS.inc(usage.completion_tokens or 0, backend=self.name, kind="completion")
+
+    async def complete_async(self, task, messages, context, timeout):
+        completion = await self.async_client.chat.completions.create(
+            messages=messages,
+            model=self.model,
+            response_format={"type": "json_object"},
+            timeout=timeout
+        )
+        self._record_usage(completion)
+        return completion.choices[0].message.content
+
+
+class LocalBackend(LLMBackend):
+    """
+    Deterministic, offline stand-in. Ranks candidates by TF-IDF similarity to
+    the student bio and explains each match with the terms they share.
+    """
+
+    name = "local"
+
+    def complete(self, task, messages, context, timeout):
+        if task == "categories":
+            return json.dumps({"categories": self._categories(context)})
+        if task == "rank":
+            return json.dumps({"matches": self._rank(context)})
+        raise ValueError(f"Unknown LLM task: {task}")
+
+    def _categories(self, context):
+        import retrieval
+        bio_terms = set(retrieval.TOKEN_RE.findall(context["student_bio"].lower()))
+        known = context.get("categories") or []
+        matched = [c for c in known if bio_terms & set(retrieval.TOKEN_RE.findall(str(c).lower()))]
+        return matched or ["STEM"]
+
+    def _rank(self, context):
+        import retrieval
+        jobs = context["jobs"]
+        if not jobs:
+            return []
+        bio = context["student_bio"]
+        index = retrieval.CatalogueIndex([text for _, text in jobs])
+        scores = index.scores(bio)
+        order = sorted(range(len(jobs)), key=lambda i: (-scores[i], i))[:LOCAL_TOP_N]
+        # Only real words make a readable explanation (skip GPA digits etc.)
+        bio_terms = {t for t in retrieval.TOKEN_RE.findall(bio.lower())
+                     if t.isalpha() and len(t) > 2} - retrieval.STOP_WORDS
+        matches = []
+        for i in order:
+            job_id, text = jobs[i]
+            shared = sorted(bio_terms & set(retrieval.TOKEN_RE.findall(text.lower())))[:3]
+            reason = f"Matches your interest in {', '.join(shared)}" if shared else "Close match to your overall profile"
+            matches.append({"id": int(job_id), "reason": reason})
+        return matches
+
+
+BACKENDS = {
+    "groq": GroqBackend,
+    "local": LocalBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+# One semaphore per event loop (a semaphore can't be shared across loops)
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def get_backend():
+    """The active backend, created on first use from INTERNNET_LLM_BACKEND."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = os.environ.get("INTERNNET_LLM_BACKEND") or ("groq" if GROQ_API_KEY else "local")
+                _backend = BACKENDS[name]()
+                logger.info(f"Using '{name}' LLM backend")
+    return _backend
+
+
+def set_backend(backend):
+    """Swap the active backend (e.g. LocalBackend() for load tests)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def _histogram(backend_name, task):
+    return metrics.LLM_LATENCY.labels(backend=backend_name, task=task)
+
+
+def _record_error(backend_name, task):
+    metrics.LLM_ERRORS.inc(backend=backend_name, task=task)
+
+
+def complete_json(task, messages, context=None, timeout=LLM_TIMEOUT, retries=LLM_RETRIES):
+    """
+    Run `task` on the active backend and parse its JSON answer. Failed calls
+    (errors, timeouts, unparseable output) are retried with exponential
+    backoff and jitter; the last error is raised once retries run out.
+    """
+    backend = get_backend()
+    histogram = _histogram(backend.name, task)
+    attempt = 0
+    while True:
+        start = time.perf_counter()
+        try:
+            result = json.loads(backend.complete(task, messages, context or {}, timeout))
+            histogram.observe(time.perf_counter() - start)
+            return result
+        except Exception as e:
+            histogram.observe(time.perf_counter() - start, error=True)
+            _record_error(backend.name, task)
+            if attempt >= retries:
+                raise
+            delay = LLM_BACKOFF * (2 ** attempt) * (0.5 + random.random())
+            logger.warning(f"LLM {backend.name}/{task} call failed ({e}); retrying in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1
+
+
+def _semaphore():
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return semaphore
+
+
+async def complete_json_async(task, messages, context=None, timeout=LLM_TIMEOUT, retries=LLM_RETRIES):
+    """
+    complete_json() for asyncio callers. Waits for a free slot when
+    LLM_MAX_CONCURRENCY calls are already in flight; backoff sleeps don't
+    hold a slot.
+    """
+    backend = get_backend()
+    histogram = _histogram(backend.name, task)
+    attempt = 0
+    while True:
+        async with _semaphore():
+            start = time.perf_counter()
+            try:
+                raw = await asyncio.wait_for(backend.complete_async(task, messages, context or {}, timeout), timeout)
+                result = json.loads(raw)
+                histogram.observe(time.perf_counter() - start)
+                return result
+            except Exception as e:
+                histogram.observe(time.perf_counter() - start, error=True)
+                _record_error(backend.name, task)
+                if attempt >= retries:
+                    raise
+                error = e
+        delay = LLM_BACKOFF * (2 ** attempt) * (0.5 + random.random())
+        logger.warning(f"LLM {backend.name}/{task} call failed ({error}); retrying in {delay:.2f}s")
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+def latency_stats():
+    return {f"{backend}/{task}": histogram.snapshot() for (backend, task), histogram in metrics.LLM_LATENCY.children()}
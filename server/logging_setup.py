@@ -0,0 +1,182 @@
+import os
+import sys
+import copy
+import json
+import queue
+import atexit
+import random
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+
+'''
+Process-wide logging setup.
+
+Loggers only put records on an in-memory queue (QueueHandler); a listener
+thread formats them and does the disk/console I/O, so no request thread
+waits on a file write. The log file holds one JSON object per line and
+rotates by size (or by time when INTERNNET_LOG_ROTATE_WHEN is set, e.g.
+"midnight"). werkzeug and gunicorn access lines for successful requests
+are sampled (INTERNNET_ACCESS_LOG_SAMPLE, default 10%); errors are always
+kept.
+
+Forked workers (gunicorn preload) get their own listener thread, since
+threads don't survive fork(). Size-based rotation is per process; with
+several workers, give each its own INTERNNET_LOG_FILE or rotate externally.
+'''
+
+LOG_FILE = os.environ.get("INTERNNET_LOG_FILE", "authentication.log")
+LOG_LEVEL = os.environ.get("INTERNNET_LOG_LEVEL", "INFO").upper()
+LOG_MAX_BYTES = int(os.environ.get("INTERNNET_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUPS = int(os.environ.get("INTERNNET_LOG_BACKUPS", "5"))
+LOG_ROTATE_WHEN = os.environ.get("INTERNNET_LOG_ROTATE_WHEN")
+ACCESS_LOG_SAMPLE = float(os.environ.get("INTERNNET_ACCESS_LOG_SAMPLE", "0.1"))
+
+CONSOLE_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, extras, exception."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value if isinstance(value, (str, int, float, bool, type(None))) else repr(value)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class AccessLogSampler(logging.Filter):
+    """
+    Keep a `rate` fraction of access lines for 1xx-3xx responses. Every
+    other record (startup banner, debugger PIN, reloader) passes.
+    """
+
+    def __init__(self, rate=ACCESS_LOG_SAMPLE):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno > logging.INFO or self.rate >= 1:
+            return True
+        # werkzeug logs requests as ('"GET /api/x HTTP/1.1"', status, size),
+        # gunicorn with a dict of atoms where "s" is the status
+        args = record.args
+        if isinstance(args, dict) and "s" in args:
+            status = args["s"]
+        elif isinstance(args, tuple) and len(args) == 3:
+            status = args[1]
+        else:
+            return True
+        try:
+            status = int(getattr(status, "value", status))
+        except (TypeError, ValueError):
+            return True
+        if status >= 400:
+            return True
+        return random.random() < self.rate
+
+
+class _QueueHandler(QueueHandler):
+    """QueueHandler that keeps the traceback separate so formatters can place it."""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+_lock = threading.Lock()
+_queue_handler = None
+_listener = None
+_output_handlers = []
+
+
+def _build_output_handlers():
+    if LOG_ROTATE_WHEN:
+        file_handler = TimedRotatingFileHandler(LOG_FILE, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUPS,
+                                                encoding="utf-8", delay=True)
+    else:
+        file_handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS,
+                                           encoding="utf-8", delay=True)
+    file_handler.setFormatter(JSONFormatter())
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+    return [file_handler, console_handler]
+
+
+def _start_listener():
+    global _listener
+    _listener = QueueListener(_queue_handler.queue, *_output_handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def _restart_after_fork():
+    # The parent's listener thread doesn't exist in the child: start a fresh
+    # queue and thread (the lock may have been held at fork time, so recreate it)
+    global _lock
+    _lock = threading.Lock()
+    if _queue_handler is not None:
+        _queue_handler.queue = queue.SimpleQueue()
+        _start_listener()
+
+
+def configure_logging():
+    """Install the queue-based logging pipeline once per process (idempotent)."""
+    global _queue_handler, _output_handlers
+    with _lock:
+        if _queue_handler is not None:
+            return
+        _output_handlers = _build_output_handlers()
+        _queue_handler = _QueueHandler(queue.SimpleQueue())
+
+        root = logging.getLogger()
+        root.setLevel(LOG_LEVEL)
+        root.addHandler(_queue_handler)
+        logging.getLogger("werkzeug").addFilter(AccessLogSampler())
+
+        _start_listener()
+        atexit.register(shutdown)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def route_access_log(access_logger):
+    """
+    Send an access logger's records (e.g. gunicorn.access) through the queue
+    and the sampler instead of its own, synchronous handlers.
+    """
+    configure_logging()
+    for handler in list(access_logger.handlers):
+        access_logger.removeHandler(handler)
+    access_logger.propagate = True
+    if not any(isinstance(f, AccessLogSampler) for f in access_logger.filters):
+        access_logger.addFilter(AccessLogSampler())
+
+
+def shutdown():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+        for handler in _output_handlers:
+            handler.flush()
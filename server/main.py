@@ -1,50 +1,100 @@
-from flask import Flask, request, jsonify
+import os
+import atexit
+from flask import Flask, Blueprint, Response, request, jsonify
 from flask_cors import CORS
-import sqlite3
 import authentication
 import logging
 import database.internships as internships_module
+from database import pool
+from database import migrations
+import database.recommendations as recommendations_cache
+import database.trackers as trackers_module
+import catalogue
+import serialization
+import compression
+import metrics
+import logging_setup
+import profile_snapshots
+import sessions
 import uuid
+import hashlib
 from datetime import datetime
 from llamaquery_ai import get_student_recommendations
-
-app = Flask(__name__)
-CORS(app)
+import llm_backends
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Every route lives on this blueprint; create_app() builds the Flask app around it
+api = Blueprint('api', __name__)
 
-def ensure_users_schema():
-    try:
-        conn = sqlite3.connect('users.db')
-        cur = conn.cursor()
-        cur.execute("PRAGMA table_info(users)")
-        cols = [r[1] for r in cur.fetchall()]
-        # Ensure required profile columns exist; add any that are missing.
-        required = {
-            'auth_token': "TEXT",
-            'extracurriculars': "TEXT",
-            'interests': "TEXT",
-            'gpa': "REAL",
-            'courses': "TEXT"
-        }
-        for col, col_type in required.items():
-            if col not in cols:
-                try:
-                    cur.execute(f"ALTER TABLE users ADD COLUMN {col} {col_type}")
-                    conn.commit()
-                    logger.info(f'Added {col} column to users table')
-                except Exception:
-                    logger.exception(f'Failed to add column {col}')
-        conn.close()
-    except Exception:
-        logger.exception('Error ensuring users schema')
-
-ensure_users_schema()
-
-
-@app.route('/api/signup', methods=['POST'])
+
+def initialize():
+    """
+    One-time process setup: bring users/internships/trackers databases up to
+    the current schema version. Runs once before any worker is forked; the
+    connections it opened are closed so no child inherits them.
+    """
+    migrations.run_migrations()
+    pool.close_all()
+
+
+def shutdown():
+    """Graceful-shutdown hook: write pending profile snapshots, then drain every connection pool."""
+    if not profile_snapshots.flush():
+        logger.warning("Timed out writing pending profile snapshots")
+    pool.close_all()
+    logger.info("Connection pools drained")
+    logging_setup.shutdown()
+
+
+def create_app():
+    """Build the Flask app (no database work happens here)."""
+    app = Flask(__name__)
+    # Expose ETag so the client can send it back in If-None-Match
+    CORS(app, expose_headers=['ETag'])
+    # Registered before compression so the recorded latency includes it
+    metrics.init_app(app)
+    # gzip/brotli for JSON bodies (see compression.py for the size/level settings)
+    compression.init_app(app)
+    app.register_blueprint(api)
+    return app
+
+
+def not_modified(etag):
+    """A 304 response if the client's If-None-Match already has `etag`, else None."""
+    # Compressed responses carry the ETag with an encoding suffix. If-None-Match
+    # uses the weak comparison, so a proxy that weakened the tag still matches
+    for variant in compression.etag_variants(etag):
+        if request.if_none_match.contains_weak(variant):
+            response = Response(status=304)
+            response.set_etag(variant)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+    return None
+
+
+def with_etag(response, etag):
+    """Tag a 200 response; no-cache makes clients revalidate instead of reusing it blindly."""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def catalogue_etag():
+    """
+    (etag, version) for a catalogue read. The strong ETag is the catalogue
+    version plus the path and query arguments, since together they select
+    what the body contains (the list and the facets of one version are
+    different representations). Build the body from the same `version`.
+    """
+    version = internships_module.get_catalogue_version()
+    args = sorted(request.args.items(multi=True))
+    digest = hashlib.sha1(repr((request.path, args)).encode('utf-8')).hexdigest()[:16]
+    return f"catalogue-{version}-{digest}", version
+
+
+@api.route('/api/signup', methods=['POST'])
 def authenticate():
     try:
         data = request.get_json()
@@ -111,7 +161,7 @@ def authenticate():
             "details": "An unexpected error occurred. Please try again later."
         }), 500
 
-@app.route('/api/login', methods=['POST'])
+@api.route('/api/login', methods=['POST'])
 def login():
     try:
         data = request.get_json()
@@ -176,7 +226,7 @@ def login():
         }), 500
 
 
-@app.route('/api/profile', methods=['GET', 'PATCH'])
+@api.route('/api/profile', methods=['GET', 'PATCH'])
 def profile():
     try:
         auth = request.headers.get('Authorization')
@@ -189,7 +239,16 @@ def profile():
             return jsonify({"success": False, "error": "Unauthorized", "details": "Invalid or missing auth token"}), 401
 
         if request.method == 'GET':
-            return jsonify({"success": True, "user": user}), 200
+            if user.get('profile_version') is None:
+                # Admin accounts have no profile version
+                return jsonify({"success": True, "user": user}), 200
+            etag = f"profile-{user['username']}-{user['profile_version']}"
+            response = not_modified(etag)
+            if response is not None:
+                return response
+            response = with_etag(jsonify({"success": True, "user": user}), etag)
+            response.headers['Vary'] = 'Authorization'
+            return response, 200
 
         # PATCH: update allowed profile fields
         payload = request.get_json()
@@ -198,6 +257,7 @@ def profile():
 
         ok = authentication.update_user_by_token(token, payload)
         if ok:
+            recommendations_cache.invalidate(user['username'])
             return jsonify({"success": True}), 200
         else:
             return jsonify({"success": False, "error": "Update failed"}), 400
@@ -206,7 +266,7 @@ def profile():
         return jsonify({"success": False, "error": "Server error", "details": "Profile error"}), 500
 
 
-@app.route('/api/admin/signup', methods=['POST'])
+@api.route('/api/admin/signup', methods=['POST'])
 def admin_signup():
     try:
         data = request.get_json()
@@ -229,7 +289,7 @@ def admin_signup():
         return jsonify({"success": False, "error": "Server error", "details": "Could not create admin account"}), 500
 
 
-@app.route('/api/admin/login', methods=['POST'])
+@api.route('/api/admin/login', methods=['POST'])
 def admin_login():
     try:
         data = request.get_json()
@@ -252,7 +312,24 @@ def admin_login():
         return jsonify({"success": False, "error": "Server error"}), 500
 
 
-@app.route('/api/recommendations', methods=['GET'])
+@api.route('/api/logout', methods=['POST'])
+def logout():
+    """End the session of the bearer token (students and admins)."""
+    try:
+        auth = request.headers.get('Authorization')
+        token = None
+        if auth and auth.startswith('Bearer '):
+            token = auth.split(' ', 1)[1]
+
+        if not authentication.logout(token):
+            return jsonify({"success": False, "error": "Unauthorized", "details": "Invalid or missing auth token"}), 401
+        return jsonify({"success": True, "message": "Logged out"}), 200
+    except Exception as e:
+        logger.error(f"Logout error: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": "Server error"}), 500
+
+
+@api.route('/api/recommendations', methods=['GET'])
 def get_recommendations():
     """
     Get AI-powered internship recommendations for the logged-in student.
@@ -264,7 +341,8 @@ def get_recommendations():
         if auth and auth.startswith('Bearer '):
             token = auth.split(' ', 1)[1]
 
-        user = authentication.get_user_by_token(token)
+        # Only the identity is needed: session tokens are checked without a DB lookup
+        user = authentication.get_identity_by_token(token)
         if not user:
             return jsonify({"success": False, "error": "Unauthorized", "details": "Invalid or missing auth token"}), 401
         
@@ -278,53 +356,181 @@ def get_recommendations():
         result = get_student_recommendations(username)
         
         if result.get('success'):
-            return jsonify(result), 200
+            return serialization.json_response(result)
         else:
-            return jsonify(result), 400
+            return serialization.json_response(result, status=400)
     
     except Exception as e:
         logger.error(f"Recommendations error: {str(e)}", exc_info=True)
         return jsonify({"success": False, "error": "Server error", "details": str(e)}), 500
 
 
-@app.route('/api/internships', methods=['GET'])
+@api.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Request, SQLite query and LLM metrics in the Prometheus text format."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@api.route('/api/stats', methods=['GET'])
+def stats():
+    """Process-level runtime stats (pools, token cache, LLM latency, compression, profile snapshots)."""
+    return jsonify({
+        "success": True,
+        "pools": pool.pool_stats(),
+        "token_cache": authentication.token_cache_stats(),
+        "llm": llm_backends.latency_stats(),
+        "compression": compression.stats(),
+        "profile_snapshots": profile_snapshots.writer.stats(),
+        "sessions": sessions.revocations.stats()
+    }), 200
+
+
+@api.route('/api/internships', methods=['GET'])
 def list_internships():
+    """
+    List internships. Optional query params:
+      q         full-text search (best matches first); not combinable with cursor
+      category  exact category filter
+      limit     page size (1..MAX_PAGE_SIZE); enables keyset pagination ordered
+                by (createdAt, id). With q: number of hits (default MAX_PAGE_SIZE)
+      cursor    next_cursor token from the previous page
+      fields    comma-separated column projection, e.g. fields=id,name,category
+                (with q, `snippet` is also available)
+    Without limit/cursor the whole (filtered) list is returned, as before.
+    """
     try:
         q = request.args.get('q')
         category = request.args.get('category')
+        cursor = request.args.get('cursor')
+        limit = request.args.get('limit')
+        fields = request.args.get('fields')
+        fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else None
+
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except ValueError:
+                return jsonify({"success": False, "error": "Invalid request", "details": "limit must be an integer"}), 400
+            limit = max(1, min(limit, internships_module.MAX_PAGE_SIZE))
+
+        if q and cursor:
+            return jsonify({"success": False, "error": "Invalid request", "details": "cursor can't be combined with q; search results are a single page"}), 400
+
+        # Search hits carry a highlighted snippet after the table columns
+        available = internships_module.COLUMNS + ("snippet",) if q else internships_module.COLUMNS
+        unknown = [f for f in fields or [] if f not in available]
+        if unknown:
+            return jsonify({"success": False, "error": "Invalid fields", "details": f"Unknown fields: {', '.join(unknown)}"}), 400
+
+        etag, version = catalogue_etag()
+        response = not_modified(etag)
+        if response is not None:
+            return response
 
         if q:
-            rows = internships_module.search_internships(q)
-        elif category:
-            rows = internships_module.filter_internships(category)
+            rows = internships_module.search_internships(q, limit=limit or internships_module.MAX_PAGE_SIZE)
+        elif limit is not None or cursor:
+            try:
+                rows, next_cursor = internships_module.list_internships_page(
+                    limit=limit or internships_module.DEFAULT_PAGE_SIZE,
+                    cursor=cursor, fields=fields, category=category)
+            except ValueError as e:
+                return jsonify({"success": False, "error": "Invalid request", "details": str(e)}), 400
+            return with_etag(serialization.json_response(
+                {"success": True, "next_cursor": next_cursor},
+                rows=rows, columns=fields or internships_module.COLUMNS, key="internships"), etag), 200
         else:
-            rows = internships_module.get_all_internships()
-
-        # Convert rows to dicts (assuming columns order from internships table)
-        internships = []
-        for r in rows:
-            internships.append({
-                "id": r[0],
-                "name": r[1],
-                "organization": r[2],
-                "Url": r[3],
-                "contact": r[4],
-                "deadline": r[5],
-                "category": r[6],
-                "location": r[7],
-                "description": r[8],
-                "creatorId": r[9],
-                "createdAt": r[10],
-                "updatedAt": r[11]
-            })
-
-        return jsonify({"success": True, "internships": internships}), 200
+            # Served from the in-memory snapshot of the current catalogue version
+            snapshot = catalogue.get_snapshot(catalogue_version=version)
+            rows = snapshot.rows(snapshot.filter(category=category) if category else None)
+
+        # Rows are encoded straight from their tuples, in internships table column order
+        columns = available
+        if fields:
+            positions = [columns.index(f) for f in fields]
+            rows = [tuple(r[p] for p in positions) for r in rows]
+            columns = fields
+
+        return with_etag(serialization.json_response(
+            {"success": True}, rows=rows, columns=columns, key="internships"), etag), 200
     except Exception as e:
         logger.error(f"Error listing internships: {str(e)}", exc_info=True)
         return jsonify({"success": False, "error": "Server error", "details": "Could not list internships"}), 500
 
 
-@app.route('/api/internships', methods=['POST'])
+@api.route('/api/internships/facets', methods=['GET'])
+def internship_facets():
+    """
+    Counts of internships per category, location and deadline month
+    (1-12), most common first, from the in-memory catalogue snapshot.
+    """
+    try:
+        etag, version = catalogue_etag()
+        response = not_modified(etag)
+        if response is not None:
+            return response
+        snapshot = catalogue.get_snapshot(catalogue_version=version)
+        return with_etag(jsonify({
+            "success": True,
+            "total": snapshot.size,
+            "facets": snapshot.facets
+        }), etag), 200
+    except Exception as e:
+        logger.error(f"Error computing facets: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": "Server error", "details": "Could not compute facets"}), 500
+
+
+# Content types of the catalogue export formats
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+@api.route('/api/internships/export', methods=['GET'])
+def export_internships():
+    """
+    Stream the live catalogue as NDJSON (default) or CSV:
+      format    ndjson | csv
+      category  exact category filter
+      gzip      1 to force gzip; otherwise negotiated from Accept-Encoding
+    Rows are read in fetchmany() batches and written as they are encoded,
+    so memory stays flat however large the catalogue is.
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"success": False, "error": "Invalid format", "details": "format must be ndjson or csv"}), 400
+    category = request.args.get('category')
+    use_gzip = request.args.get('gzip') == '1' or request.accept_encodings['gzip'] > 0
+
+    batches = internships_module.iter_internships(category=category)
+    if export_format == 'csv':
+        chunks = serialization.encode_csv(batches, internships_module.COLUMNS)
+    else:
+        chunks = serialization.encode_ndjson(batches, internships_module.COLUMNS)
+    if use_gzip:
+        chunks = serialization.gzip_chunks(chunks)
+
+    def stream():
+        # Closing the generators (finished or client gone) returns the pooled connection
+        try:
+            yield from chunks
+        except Exception as e:
+            logger.error(f"Error exporting internships: {str(e)}", exc_info=True)
+            raise
+        finally:
+            chunks.close()
+            batches.close()
+
+    response = Response(stream(), mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="internships.{export_format}"'
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+@api.route('/api/internships', methods=['POST'])
 def create_internship():
     try:
         # Require Authorization header with admin bearer token
@@ -333,8 +539,8 @@ def create_internship():
         if auth and auth.startswith('Bearer '):
             token = auth.split(' ', 1)[1]
 
-        admin = authentication.get_admin_by_token(token)
-        if not admin:
+        admin = authentication.get_identity_by_token(token)
+        if not admin or not admin['is_admin']:
             return jsonify({"success": False, "error": "Unauthorized", "details": "Admin auth token required"}), 401
 
         data = request.get_json()
@@ -365,86 +571,115 @@ def create_internship():
         return jsonify({"success": False, "error": "Server error", "details": "Could not create internship"}), 500
 
 
-@app.route('/api/tracker', methods=['GET', 'POST', 'PATCH'])
+@api.route('/api/tracker', methods=['GET', 'POST', 'PATCH'])
 def tracker():
+    """
+    Tracked internships for the logged-in user. GET /api/tracker?expand=internship
+    also returns each tracked internship's details, joined on the server.
+    """
 
     try:
-        # simple tracker storage in trackers.db
         auth = request.headers.get('Authorization')
         token = None
         if auth and auth.startswith('Bearer '):
             token = auth.split(' ', 1)[1]
 
-        user = authentication.get_user_by_token(token)
+        user = authentication.get_identity_by_token(token)
         if not user:
             return jsonify({"success": False, "error": "Unauthorized", "details": "Invalid or missing auth token"}), 401
 
         username = user['username']
-        connection = sqlite3.connect('trackers.db')
-        cursor = connection.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS trackers(
-                id TEXT PRIMARY KEY,
-                username TEXT NOT NULL,
-                internshipId TEXT NOT NULL,
-                status TEXT NOT NULL,
-                notes TEXT,
-                updatedAt TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        connection.commit()
-
         if request.method == 'POST':
             payload = request.get_json()
             internshipId = payload.get('internshipId')
-            status_field = payload.get('status') or 'interested'
-            notes = payload.get('notes') or ''
             if not internshipId:
-                connection.close()
                 return jsonify({"success": False, "error": "Missing fields", "details": "internshipId required"}), 400
 
-            tracker_id = str(uuid.uuid4())
-            cursor.execute("INSERT INTO trackers (id, username, internshipId, status, notes) VALUES (?,?,?,?,?)",
-                           (tracker_id, username, internshipId, status_field, notes))
-            connection.commit()
-            connection.close()
-            return jsonify({"success": True, "id": tracker_id}), 201
+            tracker_id, created = trackers_module.create_tracker(username, internshipId, payload.get('status'), payload.get('notes'))
+            return jsonify({"success": True, "id": tracker_id}), 201 if created else 200
 
         elif request.method == 'PATCH':
             payload = request.get_json()
             tracker_id = payload.get('id')
-            status_field = payload.get('status')
-            notes = payload.get('notes')
             if not tracker_id:
-                connection.close()
                 return jsonify({"success": False, "error": "Missing fields", "details": "tracker id required"}), 400
-            # Only allow update if tracker belongs to user
-            cursor.execute("SELECT username FROM trackers WHERE id = ?", (tracker_id,))
-            row = cursor.fetchone()
-            if not row or row[0] != username:
-                connection.close()
+            # Only updates trackers that belong to the user
+            if not trackers_module.update_tracker(username, tracker_id, payload.get('status'), payload.get('notes')):
                 return jsonify({"success": False, "error": "Unauthorized", "details": "Tracker not found or not owned by user"}), 403
-            # Update status and/or notes
-            if status_field is not None:
-                cursor.execute("UPDATE trackers SET status = ?, updatedAt = CURRENT_TIMESTAMP WHERE id = ?", (status_field, tracker_id))
-            if notes is not None:
-                cursor.execute("UPDATE trackers SET notes = ?, updatedAt = CURRENT_TIMESTAMP WHERE id = ?", (notes, tracker_id))
-            connection.commit()
-            connection.close()
             return jsonify({"success": True}), 200
 
-        else:
-            cursor.execute("SELECT id, internshipId, status, notes, updatedAt FROM trackers WHERE username = ?", (username,))
-            rows = cursor.fetchall()
-            connection.close()
-            trackers = []
-            for r in rows:
-                trackers.append({"id": r[0], "internshipId": r[1], "status": r[2], "notes": r[3], "updatedAt": r[4]})
-            return jsonify({"success": True, "trackers": trackers}), 200
+        rows = trackers_module.list_trackers(username)
+        if request.args.get('expand') != 'internship':
+            return serialization.json_response({"success": True}, rows=rows, columns=trackers_module.COLUMNS, key="trackers")
+
+        # Only the tracked internships are read, not the whole catalogue
+        trackers = [dict(zip(trackers_module.COLUMNS, r)) for r in rows]
+        details = internships_module.get_internships_by_ids([t["internshipId"] for t in trackers])
+        by_id = {r[0]: dict(zip(internships_module.COLUMNS, r)) for r in details}
+        for t in trackers:
+            t["internship"] = by_id.get(t["internshipId"])
+        return serialization.json_response({"success": True, "trackers": trackers})
 
     except Exception as e:
         logger.error(f"Tracker error: {str(e)}", exc_info=True)
         return jsonify({"success": False, "error": "Server error", "details": "Tracker error"}), 500
 
+
+# Largest number of operations accepted by one /api/tracker/batch request
+MAX_TRACKER_BATCH = 500
+
+
+@api.route('/api/tracker/batch', methods=['POST'])
+def tracker_batch():
+    """
+    Apply several tracker changes for the logged-in user in one request:
+        {"operations": [{"op": "create", "internshipId": ..., "status": ..., "notes": ...},
+                        {"op": "update", "id": ..., "status": ..., "notes": ...},
+                        {"op": "delete", "id": ...}]}
+    Ownership is checked with one query and the operations run in a single
+    transaction, so either all of them are applied or none are.
+    """
+
+    try:
+        auth = request.headers.get('Authorization')
+        token = None
+        if auth and auth.startswith('Bearer '):
+            token = auth.split(' ', 1)[1]
+
+        user = authentication.get_identity_by_token(token)
+        if not user:
+            return jsonify({"success": False, "error": "Unauthorized", "details": "Invalid or missing auth token"}), 401
+
+        payload = request.get_json(silent=True) or {}
+        operations = payload.get('operations')
+        if not isinstance(operations, list) or not operations:
+            return jsonify({"success": False, "error": "Malformed request", "details": "operations must be a non-empty list"}), 400
+        if len(operations) > MAX_TRACKER_BATCH:
+            return jsonify({"success": False, "error": "Malformed request", "details": f"At most {MAX_TRACKER_BATCH} operations per batch"}), 400
+
+        # Validate everything before touching the database
+        for i, op in enumerate(operations):
+            kind = op.get('op') if isinstance(op, dict) else None
+            if kind == 'create' and not op.get('internshipId'):
+                return jsonify({"success": False, "error": "Missing fields", "details": f"operations[{i}]: internshipId required"}), 400
+            if kind in ('update', 'delete') and not op.get('id'):
+                return jsonify({"success": False, "error": "Missing fields", "details": f"operations[{i}]: tracker id required"}), 400
+            if kind not in ('create', 'update', 'delete'):
+                return jsonify({"success": False, "error": "Malformed request", "details": f"operations[{i}]: op must be create, update or delete"}), 400
+
+        results = trackers_module.apply_operations(user['username'], operations)
+        if results is None:
+            return jsonify({"success": False, "error": "Unauthorized", "details": "Tracker not found or not owned by user"}), 403
+
+        logger.info(f"Applied {len(results)} tracker operations for {user['username']}")
+        return jsonify({"success": True, "results": results}), 200
+
+    except Exception as e:
+        logger.error(f"Tracker batch error: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": "Server error", "details": "Tracker batch error"}), 500
+
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    # Development server; use wsgi.py (gunicorn/waitress) for anything else
+    initialize()
+    atexit.register(shutdown)
+    create_app().run(debug=os.environ.get("INTERNNET_DEBUG", "1") == "1")
\ No newline at end of file
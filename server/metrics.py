@@ -0,0 +1,186 @@
+import time
+import bisect
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+'''
+In-process metrics with Prometheus text output.
+
+Counters and histograms are plain Python objects guarded by one small lock
+each, so recording in the hot path costs a dict lookup and an increment.
+Values are per process: under gunicorn every worker reports its own, and
+Prometheus should scrape the workers (or sum) accordingly.
+
+    REQUEST_LATENCY.observe(0.012, route="api.list_internships", status="200")
+    render() -> text for GET /metrics
+'''
+
+# Seconds; covers cached reads (~1 ms) up to LLM round trips (~tens of seconds)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labelnames, labels):
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _format_labels(labelnames, key, extra=()):
+    pairs = [(name, value) for name, value in zip(labelnames, key)] + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class LatencyHistogram:
+    """Cumulative latency histogram (seconds) with fixed buckets."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.errors = 0
+
+    def observe(self, seconds, error=False):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.total += seconds
+            self.count += 1
+            if error:
+                self.errors += 1
+
+    def snapshot(self):
+        with self._lock:
+            cumulative = 0
+            buckets = {}
+            for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+                cumulative += n
+                buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+            return {
+                "count": self.count,
+                "errors": self.errors,
+                "sum": round(self.total, 6),
+                "mean": round(self.total / self.count, 6) if self.count else None,
+                "buckets": buckets
+            }
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, **labels):
+        key = _label_key(self.labelnames, labels)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def children(self):
+        with self._lock:
+            return list(self._children.items())
+
+
+class _CounterValue:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount=1, **labels):
+        self.labels(**labels).inc(amount)
+
+    def render(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {child.value}" for key, child in self.children()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, help_text, labelnames)
+
+    def _new_child(self):
+        return LatencyHistogram(self.buckets)
+
+    def observe(self, seconds, error=False, **labels):
+        self.labels(**labels).observe(seconds, error)
+
+    def render(self):
+        lines = []
+        for key, child in self.children():
+            snapshot = child.snapshot()
+            for bound, count in snapshot["buckets"].items():
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', bound)])} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {snapshot['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {snapshot['count']}")
+        return lines
+
+
+REGISTRY = []
+
+REQUEST_LATENCY = Histogram(
+    "internnet_request_duration_seconds", "Time spent handling an HTTP request.", ("route", "method", "status"))
+DB_QUERY_LATENCY = Histogram(
+    "internnet_db_query_duration_seconds", "Time spent in sqlite3 execute() calls.", ("db", "statement"))
+LLM_LATENCY = Histogram(
+    "internnet_llm_call_duration_seconds", "LLM call latency per backend and task.", ("backend", "task"))
+LLM_ERRORS = Counter(
+    "internnet_llm_call_errors_total", "Failed LLM calls (errors, timeouts, bad JSON).", ("backend", "task"))
+LLM_TOKENS = Counter(
+    "internnet_llm_tokens_total", "Tokens used by LLM calls, as reported by the backend.", ("backend", "kind"))
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in list(REGISTRY):
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app):
+    """Record the latency of every request to `app` by endpoint and status."""
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_latency(response):
+        start = g.pop("_metrics_start", None)
+        if start is not None:
+            REQUEST_LATENCY.observe(time.perf_counter() - start, route=request.endpoint or "unmatched",
+                                    method=request.method, status=response.status_code)
+        return response
+
+    return app
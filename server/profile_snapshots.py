@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import tempfile
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+'''
+Write-behind JSON snapshots of student profiles (profile_data/<username>.json).
+
+Profile updates hand the new profile to schedule() and return immediately;
+a background thread writes it after a short delay. Edits to the same user
+within that delay are coalesced into one write of the latest version.
+Each file is written to a temp file in the same directory and moved into
+place with os.replace, so readers never see a half-written snapshot.
+'''
+
+SNAPSHOT_DIR = 'profile_data'
+
+# Seconds to wait for further edits before writing (coalescing window)
+SNAPSHOT_DELAY = float(os.environ.get('INTERNNET_PROFILE_SNAPSHOT_DELAY', '0.5'))
+
+
+def write_snapshot(username, profile, directory=SNAPSHOT_DIR):
+    """Atomically replace the snapshot file of one user."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{username}.json")
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{username}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+            json.dump(profile, fh, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return path
+
+
+class SnapshotWriter:
+    """Background thread writing the latest pending profile of each user."""
+
+    def __init__(self, delay=SNAPSHOT_DELAY, directory=SNAPSHOT_DIR):
+        self.delay = delay
+        self.directory = directory
+        self._pending = {}
+        self._due = {}
+        self._condition = threading.Condition()
+        self._thread = None
+        self._busy = False
+        self.scheduled = 0
+        self.written = 0
+        self.failed = 0
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='profile-snapshots', daemon=True)
+            self._thread.start()
+
+    def _reset_after_fork(self):
+        # The thread doesn't survive fork(); the parent still owns its pending writes
+        self._condition = threading.Condition()
+        self._thread = None
+        self._busy = False
+        self._pending.clear()
+        self._due.clear()
+
+    def schedule(self, username, profile):
+        """Queue `profile` for writing; replaces any pending version for the user."""
+        with self._condition:
+            self._ensure_thread()
+            self._pending[username] = profile
+            self._due.setdefault(username, time.monotonic() + self.delay)
+            self.scheduled += 1
+            self._condition.notify()
+
+    def _take_due(self):
+        now = time.monotonic()
+        due = [u for u, at in self._due.items() if at <= now]
+        batch = [(u, self._pending.pop(u)) for u in due]
+        for u in due:
+            del self._due[u]
+        return batch
+
+    def _run(self):
+        while True:
+            with self._condition:
+                batch = self._take_due()
+                while not batch:
+                    timeout = min(self._due.values()) - time.monotonic() if self._due else None
+                    self._condition.wait(timeout)
+                    batch = self._take_due()
+                self._busy = True
+            for username, profile in batch:
+                try:
+                    write_snapshot(username, profile, self.directory)
+                    self.written += 1
+                except Exception:
+                    self.failed += 1
+                    logger.exception(f'Failed to write profile JSON for user {username}')
+            with self._condition:
+                self._busy = False
+                self._condition.notify_all()
+
+    def flush(self, timeout=5.0):
+        """Write everything pending now (used on shutdown). Returns True when drained."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            if self._thread is None:
+                return not self._pending
+            for username in self._due:
+                self._due[username] = 0
+            self._condition.notify_all()
+            while self._pending or self._busy:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    def stats(self):
+        with self._condition:
+            return {
+                "pending": len(self._pending),
+                "scheduled": self.scheduled,
+                "written": self.written,
+                "failed": self.failed,
+            }
+
+
+writer = SnapshotWriter()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=writer._reset_after_fork)
+
+
+def schedule(username, profile):
+    writer.schedule(username, profile)
+
+
+def flush(timeout=5.0):
+    return writer.flush(timeout)
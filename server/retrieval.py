@@ -0,0 +1,126 @@
+import re
+import zlib
+import threading
+import logging
+import numpy as np
+import pandas as pd
+import catalogue
+
+logger = logging.getLogger(__name__)
+
+# Hashed feature space for word unigrams + bigrams
+N_FEATURES = 2 ** 18
+
+# Candidates handed to the LLM ranker
+TOP_K = 40
+
+# Internship fields that make up the searchable text of a job
+TEXT_FIELDS = ("name", "organization", "category", "location", "description")
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset("""
+    a an and are as at be by for from has have i in is it its my of on or our so that the their
+    this to was we with you your nan n a
+    name school grade gpa interests extracurriculars courses
+""".split())
+
+
+def features(text):
+    """Hashed unigram and bigram feature ids for a piece of text (stable across processes)."""
+    tokens = [t for t in TOKEN_RE.findall(str(text).lower()) if t not in STOP_WORDS]
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    return [zlib.crc32(g.encode("utf-8")) % N_FEATURES for g in grams]
+
+
+class CatalogueIndex:
+    """
+    TF-IDF vectors of every internship over hashed n-gram features, stored
+    column-wise (feature -> postings) in flat NumPy arrays. Scoring a query
+    against the whole catalogue is one gather plus one bincount.
+    """
+
+    def __init__(self, texts):
+        self.size = len(texts)
+        doc_ids, feature_ids = [], []
+        for doc, text in enumerate(texts):
+            feats = features(text)
+            doc_ids.extend([doc] * len(feats))
+            feature_ids.extend(feats)
+        doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        feature_ids = np.asarray(feature_ids, dtype=np.int64)
+
+        # Collapse repeated (doc, feature) pairs into term counts
+        pairs, counts = np.unique(feature_ids * self.size + doc_ids, return_counts=True)
+        feature_ids = pairs // max(self.size, 1)
+        doc_ids = (pairs % max(self.size, 1)).astype(np.int32)
+
+        doc_freq = np.bincount(feature_ids, minlength=N_FEATURES)
+        self.idf = (np.log((1 + self.size) / (1 + doc_freq)) + 1).astype(np.float32)
+        weights = (1 + np.log(counts)).astype(np.float32) * self.idf[feature_ids]
+
+        # L2-normalize each document vector
+        norms = np.sqrt(np.bincount(doc_ids, weights=weights.astype(np.float64) ** 2, minlength=self.size))
+        weights /= np.maximum(norms[doc_ids], 1e-12).astype(np.float32)
+
+        # pairs are sorted by feature, so postings for a feature are contiguous
+        self.postings_doc = doc_ids
+        self.postings_weight = weights
+        self.offsets = np.concatenate(([0], np.cumsum(doc_freq))).astype(np.int64)
+
+    def scores(self, query):
+        """Cosine similarity of `query` against every document."""
+        feats, counts = np.unique(np.asarray(features(query), dtype=np.int64), return_counts=True)
+        if self.size == 0 or feats.size == 0:
+            return np.zeros(self.size, dtype=np.float64)
+        query_weights = (1 + np.log(counts)) * self.idf[feats]
+        query_weights /= max(np.linalg.norm(query_weights), 1e-12)
+
+        starts, ends = self.offsets[feats], self.offsets[feats + 1]
+        lengths = ends - starts
+        # Positions of every posting of every query feature, in one array
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        contributions = self.postings_weight[positions] * np.repeat(query_weights, lengths)
+        return np.bincount(self.postings_doc[positions], weights=contributions, minlength=self.size)
+
+    def top_k(self, query, k=TOP_K):
+        """Row positions of the k best-matching documents, best first."""
+        scores = self.scores(query)
+        k = min(k, self.size)
+        if k == 0:
+            return np.array([], dtype=np.int64)
+        if not scores.any():
+            # Nothing in common with the query: keep catalogue order
+            return np.arange(k)
+        best = np.argpartition(-scores, k - 1)[:k]
+        return best[np.argsort(-scores[best], kind="stable")]
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def load_catalogue(catalogue_version):
+    """
+    The live catalogue as a DataFrame plus its CatalogueIndex, rebuilt only
+    when the catalogue version changes.
+    """
+    global _snapshot
+    snapshot = _snapshot
+    if snapshot is not None and snapshot[0] == catalogue_version:
+        return snapshot[1], snapshot[2]
+    with _snapshot_lock:
+        snapshot = _snapshot
+        if snapshot is not None and snapshot[0] == catalogue_version:
+            return snapshot[1], snapshot[2]
+        # Same rows as the shared catalogue snapshot, no second table scan
+        df_jobs = pd.DataFrame(catalogue.get_snapshot(catalogue_version).columns)
+        texts = df_jobs[list(TEXT_FIELDS)].fillna("").astype(str).agg(" ".join, axis=1).tolist() if len(df_jobs) else []
+        index = CatalogueIndex(texts)
+        _snapshot = (catalogue_version, df_jobs, index)
+        logger.info(f"Built retrieval index for catalogue v{catalogue_version} ({len(df_jobs)} internships)")
+        return df_jobs, index
+
+
+def top_candidates(df_jobs, index, student_bio, k=TOP_K):
+    """The k internships most similar to the student bio, keeping df_jobs' index labels."""
+    return df_jobs.iloc[index.top_k(student_bio, k)]
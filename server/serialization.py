@@ -0,0 +1,137 @@
+import io
+import csv
+import json
+import zlib
+import logging
+from flask import Response
+
+logger = logging.getLogger(__name__)
+
+'''
+JSON encoding for large list responses.
+
+Rows are written straight from positional tuples (as returned by a sqlite3
+cursor or the catalogue snapshot) into JSON bytes, without building a dict
+per row or going through Flask's jsonify. orjson is used when installed;
+otherwise a stdlib encoder writes each object from precomputed key prefixes.
+
+json_response() builds one body, so it can carry an ETag and be compressed
+(and cached) as a whole; list routes are bounded by pagination. The
+catalogue export instead streams fetchmany() batches
+(internships.iter_internships) through encode_ndjson/encode_csv.
+'''
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Rows encoded per chunk by encode_rows
+BATCH_SIZE = 1000
+
+_encode_string = json.encoder.encode_basestring_ascii
+_encode_other = json.JSONEncoder(separators=(",", ":")).encode
+_ENCODERS = {
+    str: _encode_string,
+    int: int.__repr__,
+    type(None): lambda value: "null",
+    bool: lambda value: "true" if value else "false",
+}
+
+
+def dumps(obj):
+    """Compact JSON bytes for any JSON-compatible object."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+# Level used for gzip'd streams (1 = fastest, 9 = smallest)
+GZIP_LEVEL = 6
+
+
+def _stdlib_batch(rows, columns, separator=","):
+    prefixes = [_encode_string(column) + ":" for column in columns]
+    prefixes[0] = "{" + prefixes[0]
+    objects = []
+    for row in rows:
+        objects.append(",".join(
+            prefix + _ENCODERS.get(type(value), _encode_other)(value)
+            for prefix, value in zip(prefixes, row)
+        ) + "}")
+    return separator.join(objects).encode("utf-8")
+
+
+def _orjson_batch(rows, columns, separator=","):
+    # orjson encodes a list of dicts faster than we can join strings
+    if separator == ",":
+        return orjson.dumps([dict(zip(columns, row)) for row in rows])[1:-1]
+    return separator.encode("utf-8").join(orjson.dumps(dict(zip(columns, row))) for row in rows)
+
+
+def encode_rows(rows, columns, batch_size=BATCH_SIZE):
+    """
+    Yield a JSON array of objects (one per row, keyed by `columns`) as byte
+    chunks. `rows` may be a list of tuples or an iterable of row batches
+    (e.g. internships.iter_internships()).
+    """
+    if not columns:
+        raise ValueError("encode_rows needs at least one column")
+    encode = _orjson_batch if orjson is not None else _stdlib_batch
+    batches = rows
+    if isinstance(rows, (list, tuple)):
+        batches = (rows[i:i + batch_size] for i in range(0, len(rows), batch_size))
+    yield b"["
+    first = True
+    for batch in batches:
+        if not batch:
+            continue
+        if not first:
+            yield b","
+        yield encode(batch, columns)
+        first = False
+    yield b"]"
+
+
+def encode_ndjson(batches, columns):
+    """Yield one JSON object per line (NDJSON) for each row of each batch."""
+    encode = _orjson_batch if orjson is not None else _stdlib_batch
+    for batch in batches:
+        if batch:
+            yield encode(batch, columns, separator="\n") + b"\n"
+
+
+def encode_csv(batches, columns):
+    """Yield a CSV header line, then the rows of each batch as CSV."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header only: the query returned nothing
+        yield buffer.getvalue().encode("utf-8")
+
+
+def gzip_chunks(chunks, level=GZIP_LEVEL):
+    """Gzip a stream of byte chunks incrementally."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def json_response(payload, status=200, rows=None, columns=None, key=None):
+    """
+    A JSON response for `payload` (a non-empty dict). When `rows` is given,
+    they are encoded with encode_rows() and added to the object under `key`.
+    """
+    body = dumps(payload)
+    if rows is not None:
+        body = b"".join([body[:-1], b',"', key.encode("utf-8"), b'":', *encode_rows(rows, columns), b"}"])
+    return Response(body, status=status, mimetype="application/json")
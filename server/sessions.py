@@ -0,0 +1,206 @@
+import os
+import hmac
+import json
+import time
+import base64
+import hashlib
+import secrets
+import tempfile
+import threading
+import logging
+from datetime import datetime, timezone
+from database import pool
+
+logger = logging.getLogger(__name__)
+
+'''
+Signed, expiring session tokens.
+
+    s1.<payload>.<signature>
+
+payload is base64url JSON {"sub": username, "role": "student"|"admin",
+"exp": unix time, "jti": random id} and signature its HMAC-SHA256 under
+the server secret. verify() checks signature, expiry and the revocation
+list without a users.db lookup per request, so routes that only need to
+know who is calling skip the principal query.
+
+Logout revokes a token by its jti: the revocation goes into this process's
+set and into users.db (revoked_sessions). Each process reloads that table
+at most every INTERNNET_SESSION_REVOCATION_REFRESH seconds, on whichever
+request thread first calls verify() after the interval has passed. Rows
+are dropped once the token they revoke has expired anyway.
+
+The secret comes from INTERNNET_SESSION_SECRET or, if unset, from a key
+file generated on first use (INTERNNET_SESSION_KEY_FILE, default
+session.key); every worker and server instance must share it.
+
+Opaque tokens from before sessions (users.auth_token / admins.auth_token)
+are accepted until INTERNNET_LEGACY_TOKENS_UNTIL (an ISO date, default
+LEGACY_TOKENS_DEFAULT_CUTOFF), and an account's opaque token is cleared as
+soon as it logs in and gets a session token.
+'''
+
+TOKEN_PREFIX = 's1.'
+USERS_DB = 'users.db'
+
+SESSION_TTL = int(os.environ.get('INTERNNET_SESSION_TTL', str(7 * 24 * 3600)))
+SESSION_KEY_FILE = os.environ.get('INTERNNET_SESSION_KEY_FILE', 'session.key')
+REVOCATION_REFRESH = float(os.environ.get('INTERNNET_SESSION_REVOCATION_REFRESH', '5'))
+# End of the migration window for opaque tokens issued before sessions
+LEGACY_TOKENS_DEFAULT_CUTOFF = '2026-12-01'
+LEGACY_TOKENS_UNTIL = os.environ.get('INTERNNET_LEGACY_TOKENS_UNTIL') or LEGACY_TOKENS_DEFAULT_CUTOFF
+
+ROLES = ('student', 'admin')
+
+_secret = None
+_secret_lock = threading.Lock()
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _load_key_file(path):
+    try:
+        with open(path, 'rb') as fh:
+            key = fh.read().strip()
+        if key:
+            return key
+    except FileNotFoundError:
+        pass
+    # Write to a temp file and link it into place: the first process wins,
+    # the others read its key
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.session.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(secrets.token_hex(32).encode('ascii'))
+        try:
+            os.link(tmp_path, path)
+            logger.info(f'Generated session signing key in {path}')
+        except FileExistsError:
+            pass
+    finally:
+        os.remove(tmp_path)
+    with open(path, 'rb') as fh:
+        return fh.read().strip()
+
+
+def secret():
+    """The HMAC key shared by every process that verifies session tokens."""
+    global _secret
+    if _secret is None:
+        with _secret_lock:
+            if _secret is None:
+                env_secret = os.environ.get('INTERNNET_SESSION_SECRET')
+                _secret = env_secret.encode('utf-8') if env_secret else _load_key_file(SESSION_KEY_FILE)
+    return _secret
+
+
+def _sign(payload):
+    return hmac.new(secret(), payload.encode('ascii'), hashlib.sha256).digest()
+
+
+def issue(username, role, ttl=None):
+    """New signed token for `username` acting as `role` ('student' or 'admin')."""
+    if role not in ROLES:
+        raise ValueError(f'Unknown role {role!r}')
+    claims = {
+        "sub": username,
+        "role": role,
+        "exp": int(time.time()) + (SESSION_TTL if ttl is None else ttl),
+        "jti": secrets.token_hex(8),
+    }
+    payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+    return f"{TOKEN_PREFIX}{payload}.{_b64encode(_sign(payload))}"
+
+
+def is_session_token(token):
+    return bool(token) and token.startswith(TOKEN_PREFIX)
+
+
+def verify(token):
+    """
+    Claims of a valid, unexpired, unrevoked session token, else None. Queries
+    users.db only when the revocation list is due for a reload.
+    """
+    if not is_session_token(token):
+        return None
+    try:
+        payload, signature = token[len(TOKEN_PREFIX):].split('.')
+        if not hmac.compare_digest(_b64decode(signature), _sign(payload)):
+            return None
+        claims = json.loads(_b64decode(payload))
+    except (ValueError, TypeError, UnicodeError):
+        return None
+    if (not isinstance(claims, dict) or claims.get('role') not in ROLES
+            or not isinstance(claims.get('sub'), str) or not isinstance(claims.get('exp'), int)):
+        return None
+    if claims['exp'] <= time.time() or revocations.is_revoked(claims.get('jti')):
+        return None
+    return claims
+
+
+def legacy_tokens_allowed(now=None):
+    """Whether opaque pre-session tokens are still accepted."""
+    until = datetime.fromisoformat(LEGACY_TOKENS_UNTIL)
+    if until.tzinfo is None:
+        until = until.replace(tzinfo=timezone.utc)
+    return (now or datetime.now(timezone.utc)) < until
+
+
+class RevocationList:
+    """Revoked token ids (jti -> expiry), mirrored from users.db revoked_sessions."""
+
+    def __init__(self, refresh=REVOCATION_REFRESH):
+        self.refresh = refresh
+        self._revoked = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _reload(self):
+        now = int(time.time())
+        try:
+            with pool.connection(USERS_DB) as connection:
+                rows = connection.execute(
+                    "SELECT jti, expiresAt FROM revoked_sessions WHERE expiresAt > ?", (now,)).fetchall()
+        except Exception:
+            # Keep the current set; retry after the next interval
+            logger.error('Failed to reload session revocations', exc_info=True)
+            return
+        revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+        revoked.update(rows)
+        self._revoked = revoked
+
+    def is_revoked(self, jti):
+        # Reloads from users.db on the calling thread once the list is stale
+        now = time.monotonic()
+        if self._loaded_at is None or now - self._loaded_at >= self.refresh:
+            with self._lock:
+                if self._loaded_at is None or now - self._loaded_at >= self.refresh:
+                    self._reload()
+                    self._loaded_at = now
+        return jti in self._revoked
+
+    def revoke(self, jti, expires_at):
+        with self._lock:
+            self._revoked[jti] = expires_at
+        with pool.connection(USERS_DB) as connection:
+            connection.execute("INSERT OR IGNORE INTO revoked_sessions (jti, expiresAt) VALUES (?, ?)",
+                               (jti, expires_at))
+            connection.execute("DELETE FROM revoked_sessions WHERE expiresAt <= ?", (int(time.time()),))
+
+    def stats(self):
+        return {"revoked": len(self._revoked), "refresh": self.refresh}
+
+
+revocations = RevocationList()
+
+
+def revoke(claims):
+    """Log out the token `claims` came from (until it would have expired anyway)."""
+    revocations.revoke(claims['jti'], claims['exp'])
@@ -0,0 +1,42 @@
+import os
+import atexit
+import logging
+import main
+
+logger = logging.getLogger(__name__)
+
+'''
+Production entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app     (Linux/macOS, multi-process)
+    python wsgi.py                            (waitress if installed, else
+                                               the threaded werkzeug server)
+
+Schema migrations run once when this module is imported. With gunicorn's
+preload_app that happens in the master before any worker is forked, and
+the pools are closed again so workers open their own SQLite connections.
+'''
+
+HOST = os.environ.get("INTERNNET_HOST", "127.0.0.1")
+PORT = int(os.environ.get("INTERNNET_PORT", "5000"))
+# Request threads for the single-process fallback servers
+THREADS = int(os.environ.get("INTERNNET_THREADS", "8"))
+
+main.initialize()
+app = main.create_app()
+
+
+def serve():
+    """Run without gunicorn: waitress when available, otherwise werkzeug's threaded server."""
+    atexit.register(main.shutdown)
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        logger.warning("waitress is not installed; using the threaded development server")
+        app.run(host=HOST, port=PORT, threaded=True, debug=False, use_reloader=False)
+        return
+    waitress_serve(app, host=HOST, port=PORT, threads=THREADS)
+
+
+if __name__ == "__main__":
+    serve()